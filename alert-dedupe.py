@@ -0,0 +1,103 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger("arbitrage-bot.alert-dedupe")
+
+# Profit change, in percentage points, worth alerting about again
+ALERT_PROFIT_DELTA = float(os.environ.get("ALERT_PROFIT_DELTA", 0.5))
+# Odds are compared in buckets this wide, so tiny moves don't count as a new price
+ALERT_ODDS_BUCKET = float(os.environ.get("ALERT_ODDS_BUCKET", 0.05))
+# How long an alert suppresses repeats, in seconds, and how many alerts are remembered
+ALERT_CACHE_TTL = float(os.environ.get("ALERT_CACHE_TTL", 3600))
+ALERT_CACHE_SIZE = int(os.environ.get("ALERT_CACHE_SIZE", 5000))
+
+def opportunity_legs(opportunity):
+    legs = []
+    number = 1
+    while f"bet{number}" in opportunity:
+        legs.append(opportunity[f"bet{number}"])
+        number += 1
+    return legs
+
+def opportunity_identity(opportunity):
+    """What makes two opportunities the same bet: event, market and each leg's bookmaker and selection"""
+    return (
+        opportunity["sport"],
+        opportunity["event"],
+        opportunity["market"],
+        tuple((leg["bookmaker"], leg["selection"]) for leg in opportunity_legs(opportunity))
+    )
+
+def odds_bucket(opportunity, bucket=ALERT_ODDS_BUCKET):
+    return tuple(round(leg["odds"] / bucket) for leg in opportunity_legs(opportunity))
+
+class AlertDeduplicator:
+    """Remembers alerted opportunities so a still-open one isn't alerted again every cycle
+
+    Fingerprints are the opportunity's identity plus its odds bucket. A repeat is
+    suppressed until its odds leave the bucket and its profit moves by the delta,
+    it closes and reopens, or its fingerprint expires. The cache is bounded and
+    evicts the least recently alerted first.
+    """
+
+    def __init__(self, ttl=ALERT_CACHE_TTL, max_size=ALERT_CACHE_SIZE, profit_delta=ALERT_PROFIT_DELTA,
+                 bucket=ALERT_ODDS_BUCKET):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.profit_delta = profit_delta
+        self.bucket = bucket
+        # identity -> (odds bucket, profit percentage alerted, alerted at), least recent first
+        self.alerted = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def should_alert(self, opportunity, now=None):
+        """Whether an opportunity is new enough to alert, remembering it if so"""
+        now = now if now is not None else time.time()
+        identity = opportunity_identity(opportunity)
+        bucket = odds_bucket(opportunity, self.bucket)
+        profit = opportunity["profit_percentage"]
+
+        with self.lock:
+            self.evict(now)
+            previous = self.alerted.get(identity)
+            if previous is not None:
+                previous_bucket, previous_profit, _ = previous
+                if previous_bucket == bucket or abs(profit - previous_profit) < self.profit_delta:
+                    self.hits += 1
+                    return False
+
+            self.misses += 1
+            self.alerted[identity] = (bucket, profit, now)
+            self.alerted.move_to_end(identity)
+            while len(self.alerted) > self.max_size:
+                self.alerted.popitem(last=False)
+            return True
+
+    def forget(self, opportunity):
+        """Drop a closed opportunity, so it is alerted again if it reopens"""
+        with self.lock:
+            self.alerted.pop(opportunity_identity(opportunity), None)
+
+    def evict(self, now):
+        cutoff = now - self.ttl
+        while self.alerted:
+            identity, (_, _, alerted_at) = next(iter(self.alerted.items()))
+            if alerted_at >= cutoff:
+                break
+            del self.alerted[identity]
+
+    def stats(self):
+        """Hit and miss counts and the share of alerts suppressed"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "suppression_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self.alerted)
+            }
@@ -0,0 +1,56 @@
+from datetime import datetime
+
+def is_middle(opportunity):
+    """Whether an opportunity is a middle that isn't also an arbitrage, so it loses a little unless the middle hits"""
+    return bool(opportunity.get("middle")) and opportunity["profit_percentage"] < 0
+
+def format_opportunity_subject(opportunity):
+    if is_middle(opportunity):
+        return f"Middle Opportunity: {-opportunity['profit_percentage']:.2f}% worst-case loss"
+    return f"Arbitrage Opportunity: {opportunity['profit_percentage']:.2f}% profit"
+
+def format_opportunity_email(opportunity):
+    """Format the arbitrage opportunity details for email"""
+    if is_middle(opportunity):
+        return format_details(opportunity, "Middle Opportunity Found!", "Worst Case")
+    return format_details(opportunity, "Arbitrage Opportunity Found!", "Expected")
+
+def format_details(opportunity, heading, outcome):
+    return f"""{heading}
+
+Profit Percentage: {opportunity['profit_percentage']:.2f}%
+
+Event: {opportunity['event']}
+Sport: {opportunity['sport']}
+Market: {opportunity['market']}
+{format_middle(opportunity)}
+Bet Details:
+{format_bets(opportunity)}
+Total Stake: ${opportunity['total_stake']:.2f}
+{outcome} Return: ${opportunity['expected_return']:.2f}
+{outcome} Profit: ${opportunity['expected_profit']:.2f}
+
+Time Found: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+
+Good luck!
+"""
+
+def format_middle(opportunity):
+    """Describe the result window where both bets of a middle win, if there is one"""
+    if not opportunity.get("middle"):
+        return ""
+    low, high = opportunity["middle"]
+    return f"Middle: both bets win between {low:g} and {high:g}\n"
+
+def format_bets(opportunity):
+    """Format every leg of an opportunity, however many outcomes its market has"""
+    bets = []
+    number = 1
+    while f"bet{number}" in opportunity:
+        bet = opportunity[f"bet{number}"]
+        bets.append(
+            f"{number}. {bet['bookmaker']} - {bet['selection']} @ {bet['odds']}\n"
+            f"   Stake: ${bet['stake']:.2f} ({bet['stake_percentage']:.1f}% of total)\n"
+        )
+        number += 1
+    return "\n".join(bets)
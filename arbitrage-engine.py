@@ -0,0 +1,196 @@
+import os
+import time
+import logging
+from odds_index import OddsIndex
+from arbitrage_finder import check_n_way_arbitrage, check_line_arbitrage, is_n_way_market
+from line_markets import line_family
+from event_matching import EVENT_MATCHING, EventMatcher, orient_market
+from metrics import DETECTION_SECONDS
+
+logger = logging.getLogger("arbitrage-bot.engine")
+
+# Drop a bookmaker's quotes for a sport if it hasn't been scraped for this long, in seconds
+QUOTE_TTL = float(os.environ.get("QUOTE_TTL", 600))
+
+class IncrementalArbitrageEngine:
+    """Keeps the latest quotes between cycles and only re-checks markets whose best prices moved
+
+    Quotes are grouped like find_arbitrage_opportunities groups them, by
+    (sport, event, market), and held in an OddsIndex. Markets with a varying
+    number of outcomes, and spreads and totals grouped by (sport, event, family)
+    across all their lines, are kept as raw quotes instead and re-checked
+    whenever one of them changes. Event names are resolved to one canonical name per
+    fixture first, and the selections of a name listing the sides the other way
+    round are reordered to match. Each update returns open, update and close events.
+    """
+
+    def __init__(self, quote_ttl=QUOTE_TTL, matcher=None):
+        self.quote_ttl = quote_ttl
+        self.matcher = matcher or (EventMatcher() if EVENT_MATCHING else None)
+        self.index = OddsIndex()
+        # (bookmaker, sport) -> group keys that bookmaker last reported for the sport
+        self.reported = {}
+        # (bookmaker, sport) -> when that bookmaker's sport was last scraped
+        self.last_seen = {}
+        # (sport, event, market) -> {bookmaker: market} for N-way markets
+        self.n_way_quotes = {}
+        # (sport, event, "spread" or "total") -> {bookmaker: [markets]} for line markets
+        self.line_quotes = {}
+        self.open_opportunities = {}
+
+    def update(self, odds_by_bookmaker, now=None):
+        """Apply one scrape per bookmaker ({bookmaker: {sport: [markets]}}) and return the events"""
+        now = now if now is not None else time.time()
+        changed = set()
+        quotes = 0
+        started = time.perf_counter()
+
+        if self.matcher is not None:
+            self.matcher.evict(now)
+
+        for bookmaker, odds in odds_by_bookmaker.items():
+            for sport, markets in odds.items():
+                changed |= self.apply_sport(bookmaker, sport, markets, now)
+                quotes += len(markets)
+
+        changed |= self.expire(now)
+        grouped = time.perf_counter()
+        DETECTION_SECONDS.observe(grouped - started, "incremental", "grouping")
+        events = self.evaluate(changed)
+        DETECTION_SECONDS.observe(time.perf_counter() - grouped, "incremental", "evaluation")
+
+        logger.info(
+            f"Applied {quotes} quotes: {len(changed)} markets changed, "
+            f"{sum(1 for event in events if event['type'] == 'open')} opened, "
+            f"{sum(1 for event in events if event['type'] == 'update')} updated, "
+            f"{sum(1 for event in events if event['type'] == 'close')} closed, "
+            f"{len(self.open_opportunities)} open"
+        )
+        return events
+
+    def apply_sport(self, bookmaker, sport, markets, now=None):
+        """Replace a bookmaker's quotes for one sport, returning the group keys that changed"""
+        now = now if now is not None else time.time()
+        changed = set()
+        seen = set()
+        line_markets = {}
+
+        for market in markets:
+            event = market["event"]
+            if self.matcher is not None:
+                event, swapped = self.matcher.resolve(sport, event, bookmaker, now)
+                market = orient_market(market, swapped)
+
+            family = line_family(market["market"])
+            if family is not None:
+                # Every line the bookmaker quotes is checked together
+                line_markets.setdefault((sport, event, family), []).append(market)
+                continue
+
+            key = (sport, event, market["market"])
+            seen.add(key)
+            if self.apply_market(key, bookmaker, market):
+                changed.add(key)
+
+        for key, family_markets in line_markets.items():
+            seen.add(key)
+            quotes = self.line_quotes.setdefault(key, {})
+            if quotes.get(bookmaker) != family_markets:
+                quotes[bookmaker] = family_markets
+                changed.add(key)
+
+        # Markets the bookmaker no longer lists are off the board
+        for key in self.reported.get((bookmaker, sport), set()) - seen:
+            if self.remove_quote(key, bookmaker):
+                changed.add(key)
+
+        self.reported[(bookmaker, sport)] = seen
+        self.last_seen[(bookmaker, sport)] = now
+        return changed
+
+    def apply_market(self, key, bookmaker, market):
+        """Store one bookmaker's quote for a market group, returning whether it needs re-checking"""
+        if is_n_way_market(key[2]):
+            quotes = self.n_way_quotes.setdefault(key, {})
+            if quotes.get(bookmaker) == market:
+                return False
+            quotes[bookmaker] = market
+            return True
+
+        bookmakers_before = self.index.bookmaker_count(key)
+        best_changed = self.index.update(key, bookmaker, market["odds"])
+        # A second bookmaker makes a market checkable even if it doesn't beat any price
+        return best_changed or (bookmakers_before < 2) != (self.index.bookmaker_count(key) < 2)
+
+    def remove_quote(self, key, bookmaker):
+        for raw_quotes in (self.n_way_quotes, self.line_quotes):
+            if key in raw_quotes:
+                quotes = raw_quotes[key]
+                if quotes.pop(bookmaker, None) is None:
+                    return False
+                if not quotes:
+                    del raw_quotes[key]
+                return True
+
+        bookmakers_before = self.index.bookmaker_count(key)
+        best_changed = self.index.remove(key, bookmaker)
+        return best_changed or (bookmakers_before < 2) != (self.index.bookmaker_count(key) < 2)
+
+    def expire(self, now):
+        """Drop quotes from bookmaker sports that haven't been scraped within the TTL"""
+        changed = set()
+        for reported_key, seen_at in list(self.last_seen.items()):
+            if now - seen_at <= self.quote_ttl:
+                continue
+            bookmaker, sport = reported_key
+            logger.info(f"Expiring stale {bookmaker} {sport} quotes")
+            for key in self.reported.pop(reported_key, set()):
+                if self.remove_quote(key, bookmaker):
+                    changed.add(key)
+            del self.last_seen[reported_key]
+        return changed
+
+    def evaluate(self, keys):
+        """Re-check market groups whose best prices changed and diff them against the open opportunities"""
+        events = []
+        for key in keys:
+            if key in self.n_way_quotes:
+                opportunity = self.n_way_opportunity(key)
+            elif key in self.line_quotes:
+                opportunity = self.line_opportunity(key)
+            else:
+                opportunity = self.index.opportunity(key)
+
+            previous = self.open_opportunities.get(key)
+            if opportunity is not None:
+                self.open_opportunities[key] = opportunity
+                if previous is None:
+                    events.append({"type": "open", "key": key, "opportunity": opportunity})
+                elif previous != opportunity:
+                    events.append({"type": "update", "key": key, "opportunity": opportunity, "previous": previous})
+            elif previous is not None:
+                del self.open_opportunities[key]
+                events.append({"type": "close", "key": key, "opportunity": previous})
+
+        return events
+
+    def n_way_opportunity(self, key):
+        """Check an N-way market group against its latest quotes, like the finder does"""
+        quotes = self.n_way_quotes[key]
+        if len(quotes) < 2:
+            return None
+        sport, event, market_type = key
+        return check_n_way_arbitrage(sport, event, market_type, list(quotes.values()))
+
+    def line_opportunity(self, key):
+        """Check a spread or total group across all its bookmakers' lines, like the finder does"""
+        quotes = self.line_quotes[key]
+        if len(quotes) < 2:
+            return None
+        sport, event, family = key
+        markets = [market for family_markets in quotes.values() for market in family_markets]
+        return check_line_arbitrage(sport, event, family, markets)
+
+    def opportunities(self):
+        """All currently open opportunities"""
+        return list(self.open_opportunities.values())
@@ -1,89 +1,93 @@
+import time
 import logging
 from itertools import combinations
+from event_matching import EVENT_MATCHING, EventMatcher, canonicalize_events
+from line_markets import line_family, line_quotes, best_line_pair
+from metrics import DETECTION_SECONDS
 
 logger = logging.getLogger("arbitrage-bot.arbitrage")
 
-def find_arbitrage_opportunities(bet365_odds, betmgm_odds, stake_odds):
-    """Find arbitrage opportunities across the three bookmakers"""
+# Shared across calls so event names resolved in one cycle are cached for the next
+event_matcher = EventMatcher() if EVENT_MATCHING else None
+
+def find_arbitrage_opportunities(*bookmaker_odds, matcher=None):
+    """Find arbitrage opportunities across any number of bookmakers"""
     logger.info("Searching for arbitrage opportunities")
     
     opportunities = []
+    started = time.perf_counter()
+    
+    # Bookmakers name the same fixture differently, group them under one canonical name
+    matcher = matcher or event_matcher
+    if matcher is not None:
+        bookmaker_odds = canonicalize_events(bookmaker_odds, matcher)
     
     # Combine all odds into a single structure for easier processing
     all_odds = {}
+    # Spreads and totals are grouped by family instead, their lines are compared separately
+    line_odds = {}
     
-    # Process Bet365 odds
-    for sport, markets in bet365_odds.items():
-        if sport not in all_odds:
-            all_odds[sport] = {}
-            
-        for market in markets:
-            event = market["event"]
-            market_type = market["market"]
-            
-            if event not in all_odds[sport]:
-                all_odds[sport][event] = {}
+    # Each argument is one bookmaker's {sport: [markets]} scrape
+    for odds in bookmaker_odds:
+        for sport, markets in odds.items():
+            if sport not in all_odds:
+                all_odds[sport] = {}
                 
-            if market_type not in all_odds[sport][event]:
-                all_odds[sport][event][market_type] = []
-                
-            all_odds[sport][event][market_type].append(market)
-    
-    # Process BetMGM odds
-    for sport, markets in betmgm_odds.items():
-        if sport not in all_odds:
-            all_odds[sport] = {}
-            
-        for market in markets:
-            event = market["event"]
-            market_type = market["market"]
-            
-            if event not in all_odds[sport]:
-                all_odds[sport][event] = {}
+            for market in markets:
+                event = market["event"]
+                market_type = market["market"]
                 
-            if market_type not in all_odds[sport][event]:
-                all_odds[sport][event][market_type] = []
+                family = line_family(market_type)
+                if family is not None:
+                    line_odds.setdefault((sport, event, family), []).append(market)
+                    continue
                 
-            all_odds[sport][event][market_type].append(market)
+                if event not in all_odds[sport]:
+                    all_odds[sport][event] = {}
+                    
+                if market_type not in all_odds[sport][event]:
+                    all_odds[sport][event][market_type] = []
+                    
+                all_odds[sport][event][market_type].append(market)
     
-    # Process Stake odds
-    for sport, markets in stake_odds.items():
-        if sport not in all_odds:
-            all_odds[sport] = {}
-            
-        for market in markets:
-            event = market["event"]
-            market_type = market["market"]
-            
-            if event not in all_odds[sport]:
-                all_odds[sport][event] = {}
-                
-            if market_type not in all_odds[sport][event]:
-                all_odds[sport][event][market_type] = []
-                
-            all_odds[sport][event][market_type].append(market)
-    
-    # Check for arbitrage opportunities
+    # Only check markets quoted by at least 2 different bookmakers
+    groups = []
     for sport in all_odds:
         for event in all_odds[sport]:
             for market_type in all_odds[sport][event]:
-                # Only check if we have markets from at least 2 different bookmakers
                 markets = all_odds[sport][event][market_type]
                 bookmakers = set(market["bookmaker"] for market in markets)
                 
                 if len(bookmakers) >= 2:
-                    # Check for arbitrage in this market
-                    opportunity = check_arbitrage(sport, event, market_type, markets)
-                    if opportunity:
-                        opportunities.append(opportunity)
+                    groups.append((sport, event, market_type, markets))
+    
+    grouped = time.perf_counter()
+    DETECTION_SECONDS.observe(grouped - started, "full", "grouping")
     
+    # Check for arbitrage opportunities
+    for sport, event, market_type, markets in groups:
+        opportunity = check_arbitrage(sport, event, market_type, markets)
+        if opportunity:
+            opportunities.append(opportunity)
+    
+    for (sport, event, family), markets in line_odds.items():
+        if len(set(market["bookmaker"] for market in markets)) >= 2:
+            opportunity = check_line_arbitrage(sport, event, family, markets)
+            if opportunity:
+                opportunities.append(opportunity)
+    
+    DETECTION_SECONDS.observe(time.perf_counter() - grouped, "full", "evaluation")
     logger.info(f"Found {len(opportunities)} arbitrage opportunities")
     return opportunities
 
 def check_arbitrage(sport, event, market_type, markets):
     """Check if there's an arbitrage opportunity in the given markets"""
+    # For markets with any number of outcomes (like set betting or outright winners)
+    if is_n_way_market(market_type):
+        return check_n_way_arbitrage(sport, event, market_type, markets)
+    
     # For binary markets (2 outcomes, like Home/Away)
-    if is_binary_market(market_type):
+    elif is_binary_market(market_type):
         return check_binary_arbitrage(sport, event, market_type, markets)
     
     # For 3-way markets (like Home/Draw/Away)
@@ -92,11 +96,21 @@ def check_arbitrage(sport, event, market_type, markets):
     
     return None
 
+def market_outcome_count(market_type):
+    """Number of outcomes check_arbitrage expects for a market type, None if it isn't checked or varies"""
+    if is_n_way_market(market_type):
+        return None
+    elif is_binary_market(market_type):
+        return 2
+    elif is_three_way_market(market_type):
+        return 3
+    return None
+
 def is_binary_market(market_type):
     """Check if the market is binary (2 outcomes)"""
     binary_markets = [
         "Money Line", "Head to Head", "Match Winner", 
-        "To Win", "Match Result", "Spread", "Handicap"
+        "To Win", "Match Result"
     ]
     return any(market in market_type for market in binary_markets)
 
@@ -107,6 +121,84 @@ def is_three_way_market(market_type):
     ]
     return any(market in market_type for market in three_way_markets)
 
+def is_n_way_market(market_type):
+    """Check if the market has a varying number of outcomes, matched up by selection name"""
+    n_way_markets = [
+        "Set Betting", "Outright", "Tournament Winner", "Correct Score", "Winning Margin"
+    ]
+    return any(market in market_type for market in n_way_markets)
+
+def align_n_way(markets):
+    """Line up each bookmaker's quote by selection name, against the longest list of selections
+
+    Returns copies of the usable markets with their odds in the same outcome order,
+    and 0 odds for outcomes a bookmaker doesn't price. Quotes naming a selection
+    outside the longest list are about some other set of outcomes and are skipped.
+    Returns nothing if any bookmaker's list is incomplete, like an outright page
+    showing only the favourites, since the longest list may then miss outcomes too.
+    """
+    # A bookmaker's own prices over every outcome imply 100% plus its margin, less means outcomes are missing
+    for market in markets:
+        if sum(1 / selection["odds"] for selection in market["odds"] if selection["odds"] > 0) < 1:
+            return []
+    
+    longest = max(markets, key=lambda market: len(market["odds"]))["odds"]
+    outcomes = {selection["selection"].strip().lower(): index for index, selection in enumerate(longest)}
+    if len(outcomes) < 2 or len(outcomes) != len(longest):
+        # Repeated selection names can't be told apart
+        return []
+    
+    order = list(outcomes)
+    aligned = []
+    for market in markets:
+        # Most bookmakers list the selections in the same order
+        if [selection["selection"].strip().lower() for selection in market["odds"]] == order:
+            aligned.append(market)
+            continue
+        
+        odds = [{"selection": None, "odds": 0}] * len(outcomes)
+        for selection in market["odds"]:
+            index = outcomes.get(selection["selection"].strip().lower())
+            if index is None:
+                break
+            odds[index] = selection
+        else:
+            aligned.append({**market, "odds": odds})
+    
+    return aligned
+
+def check_n_way_arbitrage(sport, event, market_type, markets):
+    """Check for arbitrage in markets with any number of outcomes"""
+    aligned = align_n_way(markets)
+    if not aligned:
+        return None
+    
+    # Find the best odds for each selection
+    legs = [(0, "", None)] * len(aligned[0]["odds"])
+    for market in aligned:
+        for outcome, selection in enumerate(market["odds"]):
+            if selection["odds"] > legs[outcome][0]:
+                legs[outcome] = (selection["odds"], market["bookmaker"], selection["selection"])
+    
+    return build_opportunity(sport, event, market_type, legs)
+
+def check_line_arbitrage(sport, event, family, markets, total_stake=1000):
+    """Check spreads or totals across all their lines for an arbitrage or a middle"""
+    pair = best_line_pair(*line_quotes(family, event, markets))
+    if pair is None:
+        return None
+    
+    over, under, margin = pair
+    legs = [(quote[1], quote[2], quote[3]) for quote in (over, under)]
+    stakes = [total_stake * (1 / odds) / margin for odds, _, _ in legs]
+    
+    # Spread lines are thresholds on the first side's winning margin
+    market_type = f"{family.title()} {over[0]:g}/{under[0]:g}"
+    opportunity = opportunity_dict(sport, event, market_type, legs, stakes, ((1 / margin) - 1) * 100, total_stake)
+    # Results strictly between the lines win both bets
+    opportunity["middle"] = [over[0], under[0]] if over[0] < under[0] else None
+    return opportunity
+
 def check_binary_arbitrage(sport, event, market_type, markets):
     """Check for arbitrage in binary markets"""
     best_odds = {"selection1": 0, "selection2": 0, "bookmaker1": "", "bookmaker2": ""}
@@ -136,43 +228,10 @@ def check_binary_arbitrage(sport, event, market_type, markets):
     
     # Check if we have an arbitrage opportunity
     if best_odds["selection1"] > 0 and best_odds["selection2"] > 0:
-        margin = (1 / best_odds["selection1"]) + (1 / best_odds["selection2"])
-        
-        if margin < 1:
-            # We have an arbitrage opportunity
-            profit_percentage = ((1 / margin) - 1) * 100
-            
-            # Calculate optimal stakes for a $1000 total stake
-            total_stake = 1000
-            stake1 = total_stake * (1 / best_odds["selection1"]) / margin
-            stake2 = total_stake * (1 / best_odds["selection2"]) / margin
-            
-            expected_return = stake1 * best_odds["selection1"]
-            expected_profit = expected_return - total_stake
-            
-            return {
-                "sport": sport,
-                "event": event,
-                "market": market_type,
-                "profit_percentage": profit_percentage,
-                "total_stake": total_stake,
-                "expected_return": expected_return,
-                "expected_profit": expected_profit,
-                "bet1": {
-                    "bookmaker": best_odds["bookmaker1"],
-                    "selection": best_odds["selection1_name"],
-                    "odds": best_odds["selection1"],
-                    "stake": stake1,
-                    "stake_percentage": (stake1 / total_stake) * 100
-                },
-                "bet2": {
-                    "bookmaker": best_odds["bookmaker2"],
-                    "selection": best_odds["selection2_name"],
-                    "odds": best_odds["selection2"],
-                    "stake": stake2,
-                    "stake_percentage": (stake2 / total_stake) * 100
-                }
-            }
+        return build_opportunity(sport, event, market_type, [
+            (best_odds["selection1"], best_odds["bookmaker1"], best_odds["selection1_name"]),
+            (best_odds["selection2"], best_odds["bookmaker2"], best_odds["selection2_name"])
+        ])
     
     return None
 
@@ -213,50 +272,53 @@ def check_three_way_arbitrage(sport, event, market_type, markets):
     
     # Check if we have an arbitrage opportunity
     if best_odds["selection1"] > 0 and best_odds["selection2"] > 0 and best_odds["selection3"] > 0:
-        margin = (1 / best_odds["selection1"]) + (1 / best_odds["selection2"]) + (1 / best_odds["selection3"])
-        
-        if margin < 1:
-            # We have an arbitrage opportunity
-            profit_percentage = ((1 / margin) - 1) * 100
-            
-            # Calculate optimal stakes for a $1000 total stake
-            total_stake = 1000
-            stake1 = total_stake * (1 / best_odds["selection1"]) / margin
-            stake2 = total_stake * (1 / best_odds["selection2"]) / margin
-            stake3 = total_stake * (1 / best_odds["selection3"]) / margin
-            
-            expected_return = stake1 * best_odds["selection1"]
-            expected_profit = expected_return - total_stake
-            
-            return {
-                "sport": sport,
-                "event": event,
-                "market": market_type,
-                "profit_percentage": profit_percentage,
-                "total_stake": total_stake,
-                "expected_return": expected_return,
-                "expected_profit": expected_profit,
-                "bet1": {
-                    "bookmaker": best_odds["bookmaker1"],
-                    "selection": best_odds["selection1_name"],
-                    "odds": best_odds["selection1"],
-                    "stake": stake1,
-                    "stake_percentage": (stake1 / total_stake) * 100
-                },
-                "bet2": {
-                    "bookmaker": best_odds["bookmaker2"],
-                    "selection": best_odds["selection2_name"],
-                    "odds": best_odds["selection2"],
-                    "stake": stake2,
-                    "stake_percentage": (stake2 / total_stake) * 100
-                },
-                "bet3": {
-                    "bookmaker": best_odds["bookmaker3"],
-                    "selection": best_odds["selection3_name"],
-                    "odds": best_odds["selection3"],
-                    "stake": stake3,
-                    "stake_percentage": (stake3 / total_stake) * 100
-                }
-            }
+        return build_opportunity(sport, event, market_type, [
+            (best_odds["selection1"], best_odds["bookmaker1"], best_odds["selection1_name"]),
+            (best_odds["selection2"], best_odds["bookmaker2"], best_odds["selection2_name"]),
+            (best_odds["selection3"], best_odds["bookmaker3"], best_odds["selection3_name"])
+        ])
     
     return None
+
+def build_opportunity(sport, event, market_type, legs, total_stake=1000):
+    """Build an opportunity from the best (odds, bookmaker, selection) per outcome, if it is an arbitrage"""
+    if not legs or any(odds <= 0 for odds, _, _ in legs):
+        return None
+    
+    margin = sum(1 / odds for odds, _, _ in legs)
+    if margin >= 1:
+        return None
+    
+    # We have an arbitrage opportunity
+    profit_percentage = ((1 / margin) - 1) * 100
+    
+    # Calculate optimal stakes for the total stake
+    stakes = [total_stake * (1 / odds) / margin for odds, _, _ in legs]
+    
+    return opportunity_dict(sport, event, market_type, legs, stakes, profit_percentage, total_stake)
+
+def opportunity_dict(sport, event, market_type, legs, stakes, profit_percentage, total_stake):
+    """The opportunity reported for an arbitrage with the given legs and stakes"""
+    expected_return = stakes[0] * legs[0][0]
+    expected_profit = expected_return - total_stake
+    
+    opportunity = {
+        "sport": sport,
+        "event": event,
+        "market": market_type,
+        "profit_percentage": profit_percentage,
+        "total_stake": total_stake,
+        "expected_return": expected_return,
+        "expected_profit": expected_profit
+    }
+    
+    for number, ((odds, bookmaker, selection), stake) in enumerate(zip(legs, stakes), start=1):
+        opportunity[f"bet{number}"] = {
+            "bookmaker": bookmaker,
+            "selection": selection,
+            "odds": odds,
+            "stake": stake,
+            "stake_percentage": (stake / total_stake) * 100
+        }
+    
+    return opportunity
@@ -0,0 +1,314 @@
+import os
+import time
+import logging
+import argparse
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+from arbitrage_finder import find_arbitrage_opportunities
+from arbitrage_engine import QUOTE_TTL
+from alert_dedupe import opportunity_identity
+from odds_history import OddsHistory, HISTORY_DIR, STRING_COLUMNS
+from scrapers.snapshots import SNAPSHOT_DIR, find_snapshots, load_snapshot
+from scrapers.readiness import percentile
+
+logger = logging.getLogger("arbitrage-bot.backtest")
+
+# Processes replaying shards at once
+BACKTEST_WORKERS = int(os.environ.get("BACKTEST_WORKERS", os.cpu_count() or 1))
+
+INFINITY = float("inf")
+
+def history_scrapes(directory, day, sports=None):
+    """Recorded scrapes of one day of odds history, oldest first
+
+    Yields (timestamp, bookmaker, sport, quotes, complete) with quotes as
+    (event, market, selection, odds, continues). A compacted day only keeps the
+    ends of each run of unchanged odds, so a quote whose next row has the same
+    odds "continues": it was on the board the whole time in between.
+    """
+    segment = OddsHistory(directory).open_day(day)
+    try:
+        timestamps, odds = segment.column("timestamp"), segment.column("odds")
+        ids = {column: segment.column(column) for column in STRING_COLUMNS}
+        names = segment.strings
+        sport_ids = None if sports is None else {index for index, name in enumerate(names["sport"]) if name in sports}
+
+        # Walk backwards once to find which quotes carry on at the same odds
+        continues = bytearray(len(segment))
+        next_odds = {}
+        for row in range(len(segment) - 1, -1, -1):
+            key = (ids["bookmaker"][row], ids["event"][row], ids["market"][row], ids["selection"][row])
+            if next_odds.get(key) == odds[row]:
+                continues[row] = 1
+            next_odds[key] = odds[row]
+
+        group = None
+        quotes = []
+        for row in range(len(segment)):
+            if sport_ids is not None and ids["sport"][row] not in sport_ids:
+                continue
+            # Rows of one scrape were appended together with one timestamp
+            row_group = (timestamps[row], ids["bookmaker"][row], ids["sport"][row])
+            if row_group != group:
+                if group is not None:
+                    yield group[0], names["bookmaker"][group[1]], names["sport"][group[2]], quotes, False
+                group, quotes = row_group, []
+            quotes.append((
+                names["event"][ids["event"][row]],
+                names["market"][ids["market"][row]],
+                names["selection"][ids["selection"][row]],
+                round(odds[row], 4),
+                continues[row]
+            ))
+        if group is not None:
+            yield group[0], names["bookmaker"][group[1]], names["sport"][group[2]], quotes, False
+    finally:
+        segment.close()
+
+def snapshot_scrapes(directory, day, sports=None):
+    """Recorded scrapes of one day of scraper snapshots, oldest first, in the same shape as history_scrapes"""
+    prefix = day.replace("-", "")
+    for path in find_snapshots(directory):
+        if not os.path.basename(path).startswith(prefix):
+            continue
+        if sports is not None and os.path.basename(os.path.dirname(path)) not in sports:
+            continue
+        snapshot = load_snapshot(path)
+        timestamp = datetime.fromisoformat(snapshot["captured_at"]).timestamp()
+        quotes = [
+            (market["event"], market["market"], selection["selection"], selection["odds"], 0)
+            for market in snapshot["odds"]
+            for selection in market["odds"]
+        ]
+        # A snapshot is the whole page, anything missing from it came off the board
+        yield timestamp, snapshot["bookmaker"], snapshot["sport"], quotes, True
+
+SOURCES = {"history": history_scrapes, "snapshots": snapshot_scrapes}
+
+class Replay:
+    """Rebuilds the board from recorded scrapes and runs the finder after each one
+
+    Quotes expire quote_ttl after they were last seen, like the live engine's.
+    An opportunity opens the first time the finder reports it and closes at the
+    first check of its sport that no longer does, which gives its duration.
+    """
+
+    def __init__(self, quote_ttl=QUOTE_TTL, min_profit=0.0, finder=find_arbitrage_opportunities):
+        self.quote_ttl = quote_ttl
+        self.min_profit = min_profit
+        self.finder = finder
+        # sport -> bookmaker -> (event, market) -> {selection: (odds, expires_at)}
+        self.board = {}
+        # identity -> record of the opportunity while it is open
+        self.open = {}
+        self.closed = []
+        self.stats = {"scrapes": 0, "quotes": 0, "checks": 0, "markets_checked": 0, "finder_seconds": 0.0,
+                      "first_timestamp": None, "last_timestamp": None}
+
+    def apply(self, timestamp, bookmaker, sport, quotes, complete):
+        """Update the board with one scrape and check its sport"""
+        books = self.board.setdefault(sport, {})
+        if complete:
+            books[bookmaker] = {}
+        markets = books.setdefault(bookmaker, {})
+        for event, market, selection, odds, continues in quotes:
+            expires_at = INFINITY if continues else timestamp + self.quote_ttl
+            markets.setdefault((event, market), {})[selection] = (odds, expires_at)
+
+        self.stats["scrapes"] += 1
+        self.stats["quotes"] += len(quotes)
+        if self.stats["first_timestamp"] is None:
+            self.stats["first_timestamp"] = timestamp
+        self.stats["last_timestamp"] = timestamp
+        self.check(timestamp, sport)
+
+    def current_odds(self, timestamp, sport):
+        """Each bookmaker's live markets for a sport as the finder takes them, dropping expired quotes"""
+        bookmaker_odds = []
+        for bookmaker, markets in self.board.get(sport, {}).items():
+            records = []
+            for (event, market), selections in list(markets.items()):
+                live = {selection: quote for selection, quote in selections.items() if quote[1] >= timestamp}
+                if not live:
+                    del markets[(event, market)]
+                    continue
+                if len(live) != len(selections):
+                    markets[(event, market)] = live
+                records.append({
+                    "event": event,
+                    "market": market,
+                    "bookmaker": bookmaker,
+                    "odds": [{"selection": selection, "odds": odds} for selection, (odds, _) in live.items()]
+                })
+            if records:
+                bookmaker_odds.append({sport: records})
+        return bookmaker_odds
+
+    def check(self, timestamp, sport):
+        bookmaker_odds = self.current_odds(timestamp, sport)
+        started = time.perf_counter()
+        found = self.finder(*bookmaker_odds) if len(bookmaker_odds) >= 2 else []
+        self.stats["finder_seconds"] += time.perf_counter() - started
+        self.stats["checks"] += 1
+        self.stats["markets_checked"] += sum(len(odds[sport]) for odds in bookmaker_odds)
+
+        seen = set()
+        for opportunity in found:
+            if opportunity["profit_percentage"] < self.min_profit:
+                continue
+            identity = opportunity_identity(opportunity)
+            seen.add(identity)
+            record = self.open.get(identity)
+            if record is None:
+                self.open[identity] = {
+                    "sport": sport,
+                    "event": opportunity["event"],
+                    "market": opportunity["market"],
+                    "opened_at": timestamp,
+                    "closed_at": None,
+                    "max_profit": opportunity["profit_percentage"],
+                    "opportunity": opportunity
+                }
+            elif opportunity["profit_percentage"] > record["max_profit"]:
+                record["max_profit"] = opportunity["profit_percentage"]
+                record["opportunity"] = opportunity
+
+        for identity in [identity for identity, record in self.open.items() if record["sport"] == sport and identity not in seen]:
+            self.close(self.open.pop(identity), timestamp)
+
+    def close(self, record, timestamp):
+        record["closed_at"] = timestamp
+        record["duration"] = timestamp - record["opened_at"]
+        self.closed.append(record)
+
+    def finish(self):
+        """Close what is still open at the last scrape, returning every opportunity found"""
+        for record in self.open.values():
+            self.close(record, self.stats["last_timestamp"])
+            record["open_at_end"] = True
+        self.open = {}
+        return self.closed
+
+def replay_shard(shard):
+    """Replay one shard, a dict of source, directory, day and optional sports, in this process"""
+    replay = Replay(shard.get("quote_ttl", QUOTE_TTL), shard.get("min_profit", 0.0))
+    started = time.perf_counter()
+    for scrape in SOURCES[shard["source"]](shard["directory"], shard["day"], shard.get("sports")):
+        replay.apply(*scrape)
+    opportunities = replay.finish()
+    return {"shard": shard, "opportunities": opportunities, "seconds": time.perf_counter() - started, **replay.stats}
+
+def find_shards(source="history", directory=None, shard_by="day", days=None, sports=None):
+    """Split recorded data into independently replayable shards, one per day or per day and sport
+
+    Board state doesn't carry over between shards, so an opportunity open across
+    midnight is counted once on each side.
+    """
+    directory = directory or (HISTORY_DIR if source == "history" else SNAPSHOT_DIR)
+    available = {}
+    if source == "history":
+        history = OddsHistory(directory)
+        for day in history.days():
+            segment = history.open_day(day)
+            available[day] = set(segment.strings["sport"])
+            segment.close()
+    else:
+        for path in find_snapshots(directory):
+            name = os.path.basename(path)
+            day = f"{name[0:4]}-{name[4:6]}-{name[6:8]}"
+            available.setdefault(day, set()).add(os.path.basename(os.path.dirname(path)))
+
+    shards = []
+    for day in sorted(available):
+        if days and day not in days:
+            continue
+        day_sports = sorted(sport for sport in available[day] if not sports or sport in sports)
+        if not day_sports:
+            continue
+        if shard_by == "sport":
+            shards.extend({"source": source, "directory": directory, "day": day, "sports": [sport]} for sport in day_sports)
+        else:
+            shards.append({"source": source, "directory": directory, "day": day, "sports": day_sports if sports else None})
+    return shards
+
+def quiet_finder():
+    # The finder logs every call at info, far too much at replay speed
+    logging.getLogger("arbitrage-bot.arbitrage").setLevel(logging.WARNING)
+
+def run_backtest(source="history", directory=None, shard_by="day", workers=BACKTEST_WORKERS, days=None,
+                 sports=None, quote_ttl=QUOTE_TTL, min_profit=0.0):
+    """Replay recorded odds through the finder across a process pool and summarize what it found"""
+    shards = find_shards(source, directory, shard_by, days, sports)
+    if not shards:
+        logger.warning("No recorded odds found to replay")
+        return None
+    for shard in shards:
+        shard["quote_ttl"] = quote_ttl
+        shard["min_profit"] = min_profit
+
+    started = time.perf_counter()
+    if workers <= 1 or len(shards) == 1:
+        quiet_finder()
+        results = [replay_shard(shard) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards)), initializer=quiet_finder) as pool:
+            results = list(pool.map(replay_shard, shards))
+    elapsed = time.perf_counter() - started
+
+    opportunities = sorted((record for result in results for record in result["opportunities"]), key=lambda record: record["opened_at"])
+    durations = [record["duration"] for record in opportunities if not record.get("open_at_end")]
+    markets_checked = sum(result["markets_checked"] for result in results)
+    finder_seconds = sum(result["finder_seconds"] for result in results)
+    recorded_seconds = sum(result["last_timestamp"] - result["first_timestamp"] for result in results if result["scrapes"])
+
+    return {
+        "shards": len(shards),
+        "scrapes": sum(result["scrapes"] for result in results),
+        "quotes": sum(result["quotes"] for result in results),
+        "checks": sum(result["checks"] for result in results),
+        "markets_checked": markets_checked,
+        "seconds": elapsed,
+        "finder_seconds": finder_seconds,
+        # Finder throughput on one core, and what the whole pool got through
+        "markets_per_second": markets_checked / finder_seconds if finder_seconds else 0.0,
+        "pool_markets_per_second": markets_checked / elapsed if elapsed else 0.0,
+        "speedup": recorded_seconds / elapsed if elapsed else 0.0,
+        "opportunities": opportunities,
+        "duration_p50": percentile(durations, 0.5) if durations else None,
+        "duration_p95": percentile(durations, 0.95) if durations else None,
+        "still_open": len(opportunities) - len(durations)
+    }
+
+def format_time(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+# Replay recorded odds through the finder, e.g. python backtest.py --shard-by sport --min-profit 1
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Replay recorded odds through the arbitrage finder")
+    parser.add_argument("--source", choices=sorted(SOURCES), default="history")
+    parser.add_argument("--dir")
+    parser.add_argument("--shard-by", choices=["day", "sport"], default="day")
+    parser.add_argument("--workers", type=int, default=BACKTEST_WORKERS)
+    parser.add_argument("--day", action="append", help="Only replay this day (YYYY-MM-DD), may be repeated")
+    parser.add_argument("--sport", action="append", help="Only replay this sport, may be repeated")
+    parser.add_argument("--quote-ttl", type=float, default=QUOTE_TTL)
+    parser.add_argument("--min-profit", type=float, default=0.0)
+    parser.add_argument("--list", action="store_true", help="Print every opportunity found")
+    args = parser.parse_args()
+
+    report = run_backtest(args.source, args.dir, args.shard_by, args.workers, args.day, args.sport,
+                          args.quote_ttl, args.min_profit)
+    if report:
+        print(f"Replayed {report['scrapes']} scrapes ({report['quotes']} quotes) in {report['shards']} shards "
+              f"in {report['seconds']:.2f}s, {report['speedup']:.0f}x real time")
+        print(f"Finder: {report['checks']} checks, {report['markets_per_second']:.0f} markets/s per process, "
+              f"{report['pool_markets_per_second']:.0f} markets/s across the pool")
+        print(f"Found {len(report['opportunities'])} opportunities, {report['still_open']} still open at the end")
+        if report["duration_p50"] is not None:
+            print(f"Open for p50 {report['duration_p50']:.0f}s, p95 {report['duration_p95']:.0f}s")
+        if args.list:
+            for record in report["opportunities"]:
+                duration = "still open" if record.get("open_at_end") else f"{record['duration']:.0f}s"
+                print(f"{format_time(record['opened_at'])}  {record['sport']}  {record['event']}  {record['market']}  "
+                      f"{record['max_profit']:.2f}%  {duration}")
@@ -0,0 +1,180 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import statistics
+import tracemalloc
+from .synthetic import GENERATOR_VERSION, generate_odds, market_groups
+from alert_format import format_opportunity_email
+from arbitrage_finder import (
+    find_arbitrage_opportunities, check_binary_arbitrage, check_three_way_arbitrage,
+    is_binary_market, is_three_way_market
+)
+
+logger = logging.getLogger("arbitrage-bot.benchmarks")
+
+# Market records generated for each benchmark size
+SIZES = {"1k": 1000, "100k": 100000, "1m": 1000000}
+BENCHMARK_BASELINE = os.environ.get("BENCHMARK_BASELINE", "benchmark-baseline.json")
+# Slowdown and extra peak memory, as a share of the baseline, tolerated before a benchmark fails
+TIME_TOLERANCE = float(os.environ.get("BENCHMARK_TIME_TOLERANCE", 0.25))
+MEMORY_TOLERANCE = float(os.environ.get("BENCHMARK_MEMORY_TOLERANCE", 0.10))
+# Differences below these are noise however large a share of the baseline they are
+MIN_TIME_DELTA_MS = float(os.environ.get("BENCHMARK_MIN_TIME_DELTA_MS", 1.0))
+MIN_MEMORY_DELTA_KB = float(os.environ.get("BENCHMARK_MIN_MEMORY_DELTA_KB", 64))
+# Each benchmark runs at least this many times and for at least this many seconds
+MIN_RUNS = int(os.environ.get("BENCHMARK_RUNS", 5))
+MIN_SECONDS = 0.5
+# Traced runs for peak memory, the lowest peak counts
+MEMORY_RUNS = 3
+
+def benchmark_cases(bookmaker_odds):
+    """Benchmark name -> (function running it once, items it processes)"""
+    groups = market_groups(bookmaker_odds)
+    binary = [group for group in groups if is_binary_market(group[2])]
+    three_way = [group for group in groups if is_three_way_market(group[2]) and not is_binary_market(group[2])]
+    # The first finder call also warms the event matcher cache, as it is in a running bot
+    opportunities = find_arbitrage_opportunities(*bookmaker_odds)
+
+    def check_all(check, groups):
+        for group in groups:
+            check(*group)
+
+    return {
+        "find_arbitrage_opportunities": (lambda: find_arbitrage_opportunities(*bookmaker_odds), sum(len(group[3]) for group in groups)),
+        "check_binary_arbitrage": (lambda: check_all(check_binary_arbitrage, binary), len(binary)),
+        "check_three_way_arbitrage": (lambda: check_all(check_three_way_arbitrage, three_way), len(three_way)),
+        "format_opportunity_email": (lambda: [format_opportunity_email(opportunity) for opportunity in opportunities], len(opportunities))
+    }
+
+def measure(function):
+    """Fastest and median wall time of a function over repeated runs, and its lowest peak traced memory"""
+    times = []
+    started = time.perf_counter()
+    while len(times) < MIN_RUNS or time.perf_counter() - started < MIN_SECONDS:
+        run_started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - run_started)
+
+    # Tracing slows everything down, so memory gets runs of its own
+    peaks = []
+    for _ in range(MEMORY_RUNS):
+        tracemalloc.start()
+        try:
+            function()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peaks.append(peak)
+    return {"seconds": min(times), "median_seconds": statistics.median(times), "runs": len(times), "peak_bytes": min(peaks)}
+
+def run_benchmarks(sizes=tuple(SIZES), overlap=0.8, arbitrage_density=0.01, seed=42):
+    """Time and peak memory of every benchmark at every size, keyed "name@size" """
+    results = {}
+    for label in sizes:
+        generated_at = time.perf_counter()
+        bookmaker_odds = generate_odds(SIZES[label], overlap=overlap, arbitrage_density=arbitrage_density, seed=seed)
+        logger.info(f"Generated {label} markets in {time.perf_counter() - generated_at:.1f}s")
+
+        for name, (function, items) in benchmark_cases(bookmaker_odds).items():
+            result = measure(function)
+            result["items"] = items
+            results[f"{name}@{label}"] = result
+            logger.info(
+                f"{name}@{label}: {result['seconds'] * 1000:.2f}ms over {items} items "
+                f"(best of {result['runs']}, median {result['median_seconds'] * 1000:.2f}ms), peak {result['peak_bytes'] / 1e6:.1f}MB"
+            )
+        del bookmaker_odds
+    return results
+
+def find_regressions(results, baseline, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE,
+                     min_time_delta_ms=MIN_TIME_DELTA_MS, min_memory_delta_kb=MIN_MEMORY_DELTA_KB):
+    """Human readable descriptions of every benchmark slower or hungrier than its baseline allows
+
+    A slowdown has to show in both the fastest and the median run, so one lucky
+    baseline run or one slow run now doesn't fail the comparison on its own.
+    """
+    regressions = []
+    for key, result in results.items():
+        expected = baseline.get(key)
+        if expected is None:
+            continue
+        slower = all(
+            result[field] > expected[field] * (1 + time_tolerance)
+            and (result[field] - expected[field]) * 1000 > min_time_delta_ms
+            for field in ("seconds", "median_seconds") if field in expected
+        )
+        if slower:
+            regressions.append(
+                f"{key} took {result['seconds'] * 1000:.2f}ms, baseline {expected['seconds'] * 1000:.2f}ms "
+                f"(+{(result['seconds'] / expected['seconds'] - 1) * 100:.0f}%)"
+            )
+        growth = result["peak_bytes"] - expected["peak_bytes"]
+        if growth > expected["peak_bytes"] * memory_tolerance and growth / 1024 > min_memory_delta_kb:
+            regressions.append(
+                f"{key} peaked at {result['peak_bytes'] / 1e6:.1f}MB, baseline {expected['peak_bytes'] / 1e6:.1f}MB "
+                f"(+{(result['peak_bytes'] / max(expected['peak_bytes'], 1) - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+def load_baseline(path=BENCHMARK_BASELINE):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_baseline(results, generator, path=BENCHMARK_BASELINE):
+    """Store results as the new baseline, keeping baseline entries for sizes that weren't run"""
+    baseline = load_baseline(path) or {}
+    if baseline.get("generator") != generator:
+        baseline = {}
+    baseline["generator"] = generator
+    baseline["machine"] = {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()}
+    baseline.setdefault("results", {}).update(results)
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+# Benchmark the finder on synthetic odds, e.g. python -m benchmarks.run --sizes 1k,100k --save
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    # The finder logs every call at info
+    logging.getLogger("arbitrage-bot.arbitrage").setLevel(logging.WARNING)
+
+    parser = argparse.ArgumentParser(description="Benchmark the arbitrage finder on synthetic odds")
+    parser.add_argument("--sizes", default=",".join(SIZES), help=f"Comma separated, from {', '.join(SIZES)}")
+    parser.add_argument("--overlap", type=float, default=0.8, help="Chance each other bookmaker quotes a market too")
+    parser.add_argument("--arbitrage-density", type=float, default=0.01, help="Share of shared markets that are an arbitrage")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", default=BENCHMARK_BASELINE)
+    parser.add_argument("--save", action="store_true", help="Store these results as the baseline instead of comparing")
+    args = parser.parse_args()
+
+    sizes = [size.strip().lower() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+    generator = {"version": GENERATOR_VERSION, "overlap": args.overlap, "arbitrage_density": args.arbitrage_density, "seed": args.seed}
+
+    results = run_benchmarks(sizes, args.overlap, args.arbitrage_density, args.seed)
+    if args.save:
+        save_baseline(results, generator, args.baseline)
+        print(f"Saved {len(results)} results to {args.baseline}")
+        sys.exit(0)
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}, run with --save to store one")
+        sys.exit(0)
+    if baseline.get("generator") != generator:
+        print(f"Baseline was generated with {baseline.get('generator')}, not {generator}, nothing to compare")
+        sys.exit(0)
+
+    regressions = find_regressions(results, baseline["results"])
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    compared = sum(1 for key in results if key in baseline["results"])
+    print(f"{compared} benchmarks compared against {args.baseline}, {len(regressions)} regressions")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,98 @@
+import random
+
+# Sport -> full game market type, each event also gets a first half market of the same kind
+SPORT_MARKETS = {
+    "NBA": "Money Line",
+    "NHL": "Money Line",
+    "MLB": "Money Line",
+    "Tennis": "Money Line",
+    "Soccer": "1X2"
+}
+BOOKMAKERS = ("Bet365", "BetMGM", "Stake")
+# Bumped whenever generated odds change, so baselines from an older generator aren't compared
+GENERATOR_VERSION = 2
+# Consonant-vowel syllables, a name's three letter prefix is one of 16 x 5 x 16
+SYLLABLES = [consonant + vowel for consonant in "bdfghklmnprstvwz" for vowel in "aeiou"]
+WORDS = len(SYLLABLES) ** 3
+
+def made_up_word(number):
+    """The number-th of WORDS six letter words"""
+    syllables = []
+    for _ in range(3):
+        number, index = divmod(number, len(SYLLABLES))
+        syllables.append(SYLLABLES[index])
+    return "".join(reversed(syllables)).capitalize()
+
+def team_name(number):
+    """A made-up two word team name, like a city and a nickname
+
+    Both words are unique to the team for the first WORDS teams, and every word
+    is the same length so no two teams' words abbreviate each other. Their
+    prefixes are spread like real names, so the event matcher's blocks stay small.
+    """
+    # Multipliers coprime to WORDS scramble the numbers without collisions
+    return f"{made_up_word(number * 7919 % WORDS)} {made_up_word(number * 104729 % WORDS)}"
+
+def fair_probabilities(rng, outcomes):
+    weights = [rng.uniform(0.5, 2.0) for _ in range(outcomes)]
+    total = sum(weights)
+    return [weight / total for weight in weights]
+
+def generate_odds(markets=1000, bookmakers=BOOKMAKERS, overlap=0.8, arbitrage_density=0.01, seed=42):
+    """Scraped odds for each bookmaker, shaped like bet365_odds, betmgm_odds and stake_odds
+
+    Returns one {sport: [markets]} dict per bookmaker with about `markets`
+    market records between them. Each market is quoted by one bookmaker, and by
+    every other one with probability `overlap`. `arbitrage_density` is the share
+    of markets quoted more than once whose best prices are an arbitrage, the rest
+    carry an ordinary 3 to 8% margin at every bookmaker.
+    """
+    rng = random.Random(seed)
+    odds = [{sport: [] for sport in SPORT_MARKETS} for _ in bookmakers]
+    sports = list(SPORT_MARKETS)
+    generated = 0
+    number = 0
+
+    while generated < markets:
+        sport = sports[number % len(sports)]
+        event = f"{team_name(number * 2)} vs {team_name(number * 2 + 1)}"
+        number += 1
+
+        for market_type in (SPORT_MARKETS[sport], f"1st Half {SPORT_MARKETS[sport]}"):
+            outcomes = 3 if market_type.endswith("1X2") else 2
+            names = [event.split(" vs ")[0], "Draw", event.split(" vs ")[1]] if outcomes == 3 else event.split(" vs ")
+            probabilities = fair_probabilities(rng, outcomes)
+
+            first = rng.randrange(len(bookmakers))
+            quoting = [index for index in range(len(bookmakers)) if index == first or rng.random() < overlap]
+            arbitrage = len(quoting) > 1 and rng.random() < arbitrage_density
+
+            prices = {}
+            for index in quoting:
+                margin = rng.uniform(1.03, 1.08)
+                prices[index] = [round(1 / (probability * margin), 2) for probability in probabilities]
+            if arbitrage:
+                # Each outcome's best price comes from a random bookmaker quoting the market, and together they add up to under 100%
+                edge = rng.uniform(0.9, 0.99)
+                for outcome, probability in enumerate(probabilities):
+                    prices[rng.choice(quoting)][outcome] = round(1 / (probability * edge), 2)
+
+            for index in quoting:
+                odds[index][sport].append({
+                    "event": event,
+                    "market": market_type,
+                    "bookmaker": bookmakers[index],
+                    "odds": [{"selection": name, "odds": price} for name, price in zip(names, prices[index])]
+                })
+            generated += len(quoting)
+
+    return odds
+
+def market_groups(bookmaker_odds):
+    """Markets grouped like find_arbitrage_opportunities groups them, as (sport, event, market_type, markets)"""
+    groups = {}
+    for odds in bookmaker_odds:
+        for sport, markets in odds.items():
+            for market in markets:
+                groups.setdefault((sport, market["event"], market["market"]), []).append(market)
+    return [(sport, event, market_type, markets) for (sport, event, market_type), markets in groups.items() if len(markets) >= 2]
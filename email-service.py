@@ -1,9 +1,15 @@
 import os
+import time
+import queue
+import atexit
 import smtplib
 import logging
 import datetime
+import threading
+from collections import deque
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from metrics import EMAIL_SEND_SECONDS, EMAILS
 
 logger = logging.getLogger("arbitrage-bot.email")
 
@@ -11,48 +17,249 @@ logger = logging.getLogger("arbitrage-bot.email")
 SENDER_EMAIL = os.environ.get("SENDER_EMAIL", "")
 SENDER_PASSWORD = os.environ.get("SENDER_PASSWORD", "")
 RECEIVER_EMAIL = os.environ.get("RECEIVER_EMAIL", "")
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", 587))
+# Set to 0 for a local SMTP server without TLS or login
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "1") == "1"
 
-def send_email(subject, body):
-    """Send an email with the given subject and body"""
-    logger.info(f"Sending email: {subject}")
-    
-    if not all([SENDER_EMAIL, SENDER_PASSWORD, RECEIVER_EMAIL]):
-        logger.error("Email configuration is missing. Please set SENDER_EMAIL, SENDER_PASSWORD, and RECEIVER_EMAIL environment variables.")
-        return False
-    
-    try:
-        message = MIMEMultipart()
-        message["From"] = SENDER_EMAIL
-        message["To"] = RECEIVER_EMAIL
-        message["Subject"] = subject
-        
-        message.attach(MIMEText(body, "plain"))
-        
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(SENDER_EMAIL, SENDER_PASSWORD)
-            server.send_message(message)
-            
-        logger.info("Email sent successfully")
+# Most emails sent per minute, and how often a failed one is retried before it is dropped
+EMAIL_RATE_LIMIT = float(os.environ.get("EMAIL_RATE_LIMIT", 20))
+EMAIL_RETRIES = int(os.environ.get("EMAIL_RETRIES", 5))
+# First retry delay in seconds, doubled on every further attempt up to the max
+EMAIL_BACKOFF = float(os.environ.get("EMAIL_BACKOFF", 2))
+EMAIL_BACKOFF_MAX = float(os.environ.get("EMAIL_BACKOFF_MAX", 60))
+# Alerts sent as a digest are collected for this many seconds, or until the cycle flushes them
+EMAIL_DIGEST = os.environ.get("EMAIL_DIGEST", "0") == "1"
+EMAIL_DIGEST_WINDOW = float(os.environ.get("EMAIL_DIGEST_WINDOW", 30))
+# Close the SMTP connection after this many idle seconds, before the server drops it
+SMTP_IDLE_TIMEOUT = float(os.environ.get("SMTP_IDLE_TIMEOUT", 60))
+
+def build_message(subject, body, sender=None, receiver=None):
+    message = MIMEMultipart()
+    message["From"] = sender or SENDER_EMAIL
+    message["To"] = receiver or RECEIVER_EMAIL
+    message["Subject"] = subject
+    message.attach(MIMEText(body, "plain"))
+    return message
+
+class EmailDelivery:
+    """Sends queued emails from a background thread over one reused SMTP connection
+
+    Callers only enqueue. The worker reconnects when the server drops the
+    connection, retries failures with exponential backoff, keeps under the rate
+    limit, and folds digest alerts that arrive close together into one email.
+    """
+
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, sender=SENDER_EMAIL, password=SENDER_PASSWORD,
+                 receiver=RECEIVER_EMAIL, starttls=SMTP_STARTTLS, rate_limit=EMAIL_RATE_LIMIT,
+                 retries=EMAIL_RETRIES, backoff=EMAIL_BACKOFF, backoff_max=EMAIL_BACKOFF_MAX,
+                 digest_window=EMAIL_DIGEST_WINDOW, idle_timeout=SMTP_IDLE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.password = password
+        self.receiver = receiver
+        self.starttls = starttls
+        self.rate_limit = rate_limit
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.digest_window = digest_window
+        self.idle_timeout = idle_timeout
+
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.server = None
+        self.last_used = 0.0
+        self.sent_at = deque()
+        self.digest = []
+        self.digest_due = None
+        self.stats = {"queued": 0, "sent": 0, "retries": 0, "dropped": 0, "connections": 0}
+
+    def send(self, subject, body, digest=False):
+        """Queue an email, returning False if email isn't configured"""
+        # A local SMTP server doesn't need a password
+        if not all([self.sender, self.receiver]) or (self.starttls and not self.password):
+            logger.error("Email configuration is missing. Please set SENDER_EMAIL, SENDER_PASSWORD, and RECEIVER_EMAIL environment variables.")
+            return False
+
+        self.start()
+        self.stats["queued"] += 1
+        self.queue.put(("digest" if digest else "email", subject, body))
         return True
-        
-    except Exception as e:
-        logger.error(f"Failed to send email: {str(e)}", exc_info=True)
+
+    def flush(self, wait=True, timeout=None):
+        """Send pending digest alerts, optionally waiting until everything queued so far is delivered or dropped"""
+        if self.thread is None:
+            return True
+        done = threading.Event() if wait else None
+        self.queue.put(("flush", done, None))
+        return done.wait(timeout) if wait else True
+
+    def close(self, timeout=10):
+        """Deliver what is queued and stop the worker"""
+        if self.thread is None:
+            return
+        self.flush(timeout=timeout)
+        self.queue.put(("stop", None, None))
+        self.thread.join(timeout)
+        self.thread = None
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="email-delivery", daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while True:
+            try:
+                kind, first, second = self.queue.get(timeout=self.next_wakeup())
+            except queue.Empty:
+                kind = None
+
+            if kind == "email":
+                self.deliver(first, second)
+            elif kind == "digest":
+                self.digest.append((first, second))
+                if self.digest_due is None:
+                    self.digest_due = time.monotonic() + self.digest_window
+            elif kind == "flush":
+                self.send_digest()
+                if first is not None:
+                    first.set()
+            elif kind == "stop":
+                self.send_digest()
+                self.disconnect()
+                return
+
+            if self.digest_due is not None and time.monotonic() >= self.digest_due:
+                self.send_digest()
+            if self.server is not None and time.monotonic() - self.last_used > self.idle_timeout:
+                self.disconnect()
+
+    def next_wakeup(self):
+        """Seconds until the digest is due or the idle connection should close, None to wait for work"""
+        deadlines = []
+        if self.digest_due is not None:
+            deadlines.append(self.digest_due)
+        if self.server is not None:
+            deadlines.append(self.last_used + self.idle_timeout)
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.monotonic())
+
+    def send_digest(self):
+        digest, self.digest, self.digest_due = self.digest, [], None
+        if not digest:
+            return
+        if len(digest) == 1:
+            self.deliver(*digest[0])
+            return
+        subject = f"{len(digest)} Arbitrage Opportunities"
+        body = f"\n{'=' * 40}\n\n".join(f"{alert_subject}\n\n{alert_body}" for alert_subject, alert_body in digest)
+        self.deliver(subject, body)
+
+    def deliver(self, subject, body):
+        """Send one email, reconnecting and backing off on failure"""
+        message = build_message(subject, body, self.sender, self.receiver)
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                self.stats["retries"] += 1
+                EMAILS.inc("retried")
+                delay = min(self.backoff * 2 ** (attempt - 1), self.backoff_max)
+                logger.warning(f"Retrying email in {delay:.1f}s (attempt {attempt + 1}): {subject}")
+                time.sleep(delay)
+
+            self.wait_for_rate_limit()
+            try:
+                server = self.connect()
+                with EMAIL_SEND_SECONDS.time():
+                    server.send_message(message)
+                self.last_used = time.monotonic()
+                self.sent_at.append(self.last_used)
+                self.stats["sent"] += 1
+                EMAILS.inc("sent")
+                logger.info(f"Email sent: {subject}")
+                return True
+            except Exception as e:
+                logger.error(f"Failed to send email: {str(e)}")
+                # The connection may be half dead, start over on the next attempt
+                self.disconnect()
+
+        self.stats["dropped"] += 1
+        EMAILS.inc("dropped")
+        logger.error(f"Dropping email after {self.retries + 1} attempts: {subject}")
         return False
 
-def send_test_email():
+    def wait_for_rate_limit(self):
+        if self.rate_limit <= 0:
+            return
+        window = 60.0
+        while self.sent_at and time.monotonic() - self.sent_at[0] > window:
+            self.sent_at.popleft()
+        if len(self.sent_at) >= self.rate_limit:
+            time.sleep(max(0.0, window - (time.monotonic() - self.sent_at[0])))
+            self.sent_at.popleft()
+
+    def connect(self):
+        if self.server is not None:
+            return self.server
+        server = smtplib.SMTP(self.host, self.port, timeout=30)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.password:
+                server.login(self.sender, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.server = server
+        self.stats["connections"] += 1
+        logger.debug(f"Connected to {self.host}:{self.port}")
+        return server
+
+    def disconnect(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:
+            self.server.close()
+        self.server = None
+
+# Shared delivery queue for the whole bot
+email_delivery = EmailDelivery()
+atexit.register(email_delivery.close)
+
+def send_email(subject, body):
+    """Queue an email with the given subject and body, without waiting for it to be sent"""
+    logger.info(f"Queueing email: {subject}")
+    return email_delivery.send(subject, body)
+
+def send_alert(subject, body):
+    """Queue an opportunity alert, folded into a digest with the alerts around it if EMAIL_DIGEST is on"""
+    logger.info(f"Queueing alert: {subject}")
+    return email_delivery.send(subject, body, digest=EMAIL_DIGEST)
+
+def flush_alerts():
+    """Send the pending digest now, e.g. at the end of a cycle, without waiting for it"""
+    email_delivery.flush(wait=False)
+
+def send_test_email(bookmakers=("Bet365", "BetMGM", "Stake")):
     """Send a test email when the bot first starts"""
     subject = "Sports Arbitrage Bot Active"
     body = """
 Hello,
 
-Your Sports Arbitrage Bot is now active and running. The bot will monitor Bet365, BetMGM, and Stake for arbitrage opportunities in Canadian sports markets.
+Your Sports Arbitrage Bot is now active and running. The bot will monitor {bookmakers} for arbitrage opportunities in Canadian sports markets.
 
 You will receive notifications by email when arbitrage opportunities are found.
 
 Details:
 - Bot started at: {time}
-- Monitoring: Bet365, BetMGM, Stake
+- Monitoring: {bookmakers}
 - Region: Canada
 - Check frequency: Every {interval} minutes
 - Heartbeat frequency: Every {heartbeat} minutes
@@ -60,6 +267,7 @@ Details:
 This is an automated message from your Sports Arbitrage Bot.
     """.format(
         time=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        bookmakers=", ".join(bookmakers),
         interval=os.environ.get("SCRAPE_INTERVAL", 2),
         heartbeat=os.environ.get("HEARTBEAT_INTERVAL", 3)
     )
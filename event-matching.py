@@ -0,0 +1,346 @@
+import os
+import re
+import time
+import logging
+import unicodedata
+from collections import Counter, OrderedDict
+
+logger = logging.getLogger("arbitrage-bot.event-matching")
+
+# Match event names across bookmakers before grouping markets
+EVENT_MATCHING = os.environ.get("EVENT_MATCHING", "1") == "1"
+# How long a resolved or canonical event is kept after it was last seen, in seconds
+EVENT_CACHE_TTL = float(os.environ.get("EVENT_CACHE_TTL", 6 * 3600))
+# Minimum similarity of each side of two event names for them to be the same event
+MATCH_THRESHOLD = float(os.environ.get("EVENT_MATCH_THRESHOLD", 0.75))
+# Most candidates scored per new name, best blocking overlap first
+MAX_CANDIDATES = 25
+# Block keys shared by more events than this are too common to narrow anything down
+MAX_BLOCK_SIZE = 500
+# How much each word of the longer side counts against a match once every word of the shorter side matched
+LEFT_OUT_WEIGHT = 0.125
+
+SIDE_SEPARATOR = re.compile(r"\s+(?:vs\.?|v\.?|versus|@|at)\s+|\s+-\s+")
+POSSESSIVE = re.compile(r"'s\b")
+NON_WORD = re.compile(r"[^a-z0-9 ]+")
+AGE_GROUP = re.compile(r"^u\d{2}$")
+
+# Words that don't tell teams apart
+STOPWORDS = {"fc", "cf", "sc", "afc", "ac", "the", "club", "de"}
+# Squad qualifiers, a side only matches a side with the same ones: a women's or reserve team is another fixture
+QUALIFIERS = {
+    "w": "women", "women": "women", "womens": "women", "ladies": "women",
+    "ii": "reserves", "b": "reserves", "reserves": "reserves", "res": "reserves"
+}
+
+def normalize(name):
+    """Lowercase, strip accents and punctuation, keep side separators"""
+    if not name.isascii():
+        name = unicodedata.normalize("NFKD", name)
+        name = "".join(char for char in name if not unicodedata.combining(char))
+    return " ".join(name.lower().replace("&", " and ").split())
+
+def split_sides(name):
+    """Normalized token lists for each side of an event name, e.g. home and away"""
+    sides = []
+    for side in SIDE_SEPARATOR.split(normalize(name)):
+        tokens = [token for token in NON_WORD.sub(" ", POSSESSIVE.sub("", side)).split() if token not in STOPWORDS]
+        if tokens:
+            sides.append(tokens)
+    return sides
+
+def squad_qualifiers(tokens):
+    """The qualifiers of a side, e.g. {"women"} or {"u21"}, and its remaining tokens"""
+    qualifiers = set()
+    rest = []
+    for token in tokens:
+        if token in QUALIFIERS:
+            qualifiers.add(QUALIFIERS[token])
+        elif AGE_GROUP.match(token):
+            qualifiers.add(token)
+        else:
+            rest.append(token)
+    return qualifiers, rest
+
+def is_abbreviation(short, long):
+    """Whether `short` abbreviates `long`, e.g. mtl for montreal"""
+    if short[0] != long[0]:
+        return False
+    remaining = iter(long)
+    return all(char in remaining for char in short)
+
+def tokens_match(a, b):
+    if a == b:
+        return True
+    short, long = (a, b) if len(a) <= len(b) else (b, a)
+    if len(short) < 2:
+        return False
+    if len(short) >= 3 and long.startswith(short):
+        return True
+    return len(short) <= 4 and is_abbreviation(short, long)
+
+def side_similarity(a, b):
+    """Matched tokens over matched plus unmatched tokens of both sides, 0 unless the squad qualifiers agree"""
+    return squad_similarity(squad_qualifiers(a), squad_qualifiers(b))
+
+def squad_similarity(a, b):
+    """side_similarity of two sides already split into (qualifiers, tokens) by squad_qualifiers"""
+    (qualifiers_a, a), (qualifiers_b, b) = a, b
+    if qualifiers_a != qualifiers_b:
+        return 0.0
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    short, long = (a, b) if len(a) <= len(b) else (b, a)
+    unused = list(long)
+    matched = 0
+    remaining = []
+    # Exact tokens first, so a loose match can't take a word another token names outright
+    for token in short:
+        if token in unused:
+            unused.remove(token)
+            matched += 1
+        else:
+            remaining.append(token)
+    for token in remaining:
+        # Initials of consecutive words, e.g. la for los angeles
+        length = len(token)
+        if length in (2, 3):
+            index = next(
+                (index for index in range(len(unused) - length + 1)
+                 if token == "".join(word[0] for word in unused[index:index + length])),
+                None
+            )
+            if index is not None:
+                del unused[index:index + length]
+                matched += 1
+                continue
+        for index, candidate in enumerate(unused):
+            # Prefixes and abbreviations both start with the same letter
+            if candidate[0] == token[0] and tokens_match(token, candidate):
+                del unused[index]
+                matched += 1
+                break
+    # Extra words on either side, e.g. wednesday against united, count against the match. Once every
+    # word of the shorter side matched, the rest is most likely a nickname left out, e.g. montreal
+    # against mtl canadiens, and counts for much less.
+    extra = len(unused) * (LEFT_OUT_WEIGHT if matched == len(short) else 1)
+    return matched / (len(short) + extra)
+
+def squads_orientation(a, b, floor=0.0):
+    """event_orientation of two event names already split into squads
+
+    An orientation whose first side already scores below `floor` isn't scored
+    further, so below `floor` the similarity is only an upper bound.
+    """
+    if len(a) != len(b):
+        return 0.0, False
+    if len(a) != 2:
+        merge = lambda squads: (set().union(*(qualifiers for qualifiers, _ in squads)), [token for _, tokens in squads for token in tokens])
+        return squad_similarity(merge(a), merge(b)), False
+    straight = squad_similarity(a[0], b[0])
+    if straight >= floor:
+        straight = min(straight, squad_similarity(a[1], b[1]))
+    swapped = squad_similarity(a[0], b[1])
+    if swapped >= floor:
+        swapped = min(swapped, squad_similarity(a[1], b[0]))
+    return (swapped, True) if swapped > straight else (straight, False)
+
+def event_orientation(a, b):
+    """Similarity of two split event names, the weakest side decides, and whether b lists the sides the other way round"""
+    return squads_orientation([squad_qualifiers(side) for side in a], [squad_qualifiers(side) for side in b])
+
+def event_similarity(a, b):
+    """Similarity of two split event names, the weakest side decides. Side order doesn't matter."""
+    return event_orientation(a, b)[0]
+
+def orient_market(market, swapped):
+    """A market with its selections in the canonical event's side order
+
+    Binary and three-way markets pair outcomes by position, home first, so a
+    bookmaker listing the sides the other way round has its odds reversed.
+    """
+    if not swapped:
+        return market
+    return {**market, "odds": market["odds"][::-1], "sides_swapped": True}
+
+def block_keys(sides):
+    """Keys that any name of the same event is likely to share: three letter token prefixes"""
+    return {token[:3] for side in sides for token in side if len(token) >= 2}
+
+class EventMatcher:
+    """Resolves bookmaker event names to one canonical event per real fixture
+
+    New names are only compared against events sharing a block key, and every
+    resolution is cached by (sport, name) until it hasn't been seen for the TTL.
+    """
+
+    def __init__(self, ttl=EVENT_CACHE_TTL, threshold=MATCH_THRESHOLD):
+        self.ttl = ttl
+        self.threshold = threshold
+        # (sport, raw name) -> (canonical id, whether the name lists the sides the other way round), least recently seen first
+        self.resolved = OrderedDict()
+        # canonical id -> {"sport", "name", "squads", "keys", "signatures", "names_by_bookmaker", "seen_at"}, least recently seen first
+        self.events = OrderedDict()
+        # (sport, block key) -> canonical ids
+        self.blocks = {}
+        # (sport, normalized sides) -> (canonical id, swapped) of every name resolved so far, so a name
+        # another bookmaker already used resolves without scoring candidates
+        self.exact = {}
+        # (sport, bookmaker) -> canonical ids the bookmaker lists, which its other names can't be
+        self.listed = {}
+        self.next_id = 0
+        self.hits = 0
+        self.misses = 0
+
+    def canonical_name(self, sport, name, bookmaker=None, now=None):
+        """The canonical name of the event a bookmaker lists as `name`"""
+        return self.resolve(sport, name, bookmaker, now)[0]
+
+    def resolve(self, sport, name, bookmaker=None, now=None):
+        """The canonical name of the event a bookmaker lists as `name`, and whether `name` has its sides swapped"""
+        now = now if now is not None else time.time()
+        cache_key = (sport, name)
+
+        resolution = self.resolved.get(cache_key)
+        if resolution is not None and resolution[0] in self.events:
+            self.hits += 1
+            self.resolved.move_to_end(cache_key)
+            self._touch(resolution[0], now)
+        else:
+            self.misses += 1
+            resolution = self._resolve(sport, name, bookmaker, now)
+            self.resolved[cache_key] = resolution
+            self.resolved.move_to_end(cache_key)
+
+        event_id, swapped = resolution
+        event = self.events[event_id]
+        if bookmaker is not None and bookmaker not in event["names_by_bookmaker"]:
+            event["names_by_bookmaker"][bookmaker] = name
+            self.listed.setdefault((sport, bookmaker), set()).add(event_id)
+        return event["name"], swapped
+
+    def evict(self, now=None):
+        """Forget events and resolutions not seen within the TTL"""
+        now = now if now is not None else time.time()
+        cutoff = now - self.ttl
+
+        while self.events:
+            event_id, event = next(iter(self.events.items()))
+            if event["seen_at"] >= cutoff:
+                break
+            del self.events[event_id]
+            for signature in event["signatures"]:
+                self.exact.pop((event["sport"], signature), None)
+            for bookmaker in event["names_by_bookmaker"]:
+                self.listed[(event["sport"], bookmaker)].discard(event_id)
+            for key in event["keys"]:
+                block = self.blocks.get((event["sport"], key))
+                if block is not None:
+                    block.discard(event_id)
+                    if not block:
+                        del self.blocks[(event["sport"], key)]
+
+        # Resolutions pointing at evicted events are dropped as they reach the front
+        while self.resolved:
+            cache_key, (event_id, _) = next(iter(self.resolved.items()))
+            if event_id in self.events:
+                break
+            del self.resolved[cache_key]
+
+    def _touch(self, event_id, now):
+        self.events[event_id]["seen_at"] = now
+        self.events.move_to_end(event_id)
+
+    def _resolve(self, sport, name, bookmaker, now):
+        sides = split_sides(name)
+        squads = [squad_qualifiers(side) for side in sides]
+        signature = tuple((tuple(sorted(qualifiers)), tuple(tokens)) for qualifiers, tokens in squads)
+
+        exact = self.exact.get((sport, signature))
+        if exact is None and len(signature) == 2:
+            exact = self.exact.get((sport, signature[::-1]))
+            exact = exact and (exact[0], not exact[1])
+        if exact and self._can_list(exact[0], bookmaker, name):
+            self._touch(exact[0], now)
+            return exact
+
+        keys = block_keys(sides)
+        blocks = [self.blocks.get((sport, key), ()) for key in keys]
+        blocks = [block for block in blocks if len(block) <= MAX_BLOCK_SIZE]
+        candidates = set().union(*blocks)
+        if bookmaker is not None:
+            # A difference rather than -=, which would walk every event the bookmaker lists
+            candidates = candidates - self.listed.get((sport, bookmaker), set())
+        # Past the limit, keep the candidates sharing the most block keys with the new name
+        if len(candidates) > MAX_CANDIDATES:
+            overlap = Counter()
+            for block in blocks:
+                overlap.update(block & candidates)
+            candidates = [event_id for event_id, _ in overlap.most_common(MAX_CANDIDATES)]
+        else:
+            # Oldest first, so ties resolve the same way every run
+            candidates = sorted(candidates)
+
+        best_id = None
+        best_swapped = False
+        best_score = self.threshold
+        for event_id in candidates:
+            event = self.events[event_id]
+            score, swapped = squads_orientation(event["squads"], squads, best_score)
+            if score >= best_score:
+                best_id, best_swapped, best_score = event_id, swapped, score
+                if score == 1.0:
+                    break
+
+        if best_id is not None:
+            self._touch(best_id, now)
+            self._add_signature(best_id, signature, best_swapped)
+            return best_id, best_swapped
+
+        event_id = self.next_id
+        self.next_id += 1
+        self.events[event_id] = {
+            "sport": sport,
+            "name": name,
+            "squads": squads,
+            "keys": keys,
+            "signatures": [],
+            "names_by_bookmaker": {},
+            "seen_at": now
+        }
+        for key in keys:
+            self.blocks.setdefault((sport, key), set()).add(event_id)
+        self._add_signature(event_id, signature, False)
+        return event_id, False
+
+    def _can_list(self, event_id, bookmaker, name):
+        """A bookmaker lists each fixture once, so a second name from it is another event"""
+        listed_as = self.events[event_id]["names_by_bookmaker"].get(bookmaker)
+        return bookmaker is None or listed_as is None or listed_as == name
+
+    def _add_signature(self, event_id, signature, swapped):
+        event = self.events[event_id]
+        if (event["sport"], signature) not in self.exact:
+            self.exact[(event["sport"], signature)] = (event_id, swapped)
+            event["signatures"].append(signature)
+
+def canonicalize_events(bookmaker_odds, matcher, now=None):
+    """Copies of bookmaker odds dicts with each market's event replaced by its canonical name
+
+    Markets of a name listing the sides the other way round get their selections reordered to match.
+    """
+    now = now if now is not None else time.time()
+    matcher.evict(now)
+
+    canonical_odds = []
+    for odds in bookmaker_odds:
+        canonical = {}
+        for sport, markets in odds.items():
+            canonical[sport] = []
+            for market in markets:
+                event, swapped = matcher.resolve(sport, market["event"], market.get("bookmaker"), now)
+                canonical[sport].append({**orient_market(market, swapped), "event": event})
+        canonical_odds.append(canonical)
+    return canonical_odds
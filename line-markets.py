@@ -0,0 +1,140 @@
+import os
+import re
+import logging
+from bisect import bisect_left, bisect_right
+from event_matching import split_sides, side_similarity
+
+logger = logging.getLogger("arbitrage-bot.line-markets")
+
+# Largest share of the total stake we'd risk on a middle that isn't also an arbitrage
+MIDDLE_MAX_LOSS = float(os.environ.get("MIDDLE_MAX_LOSS", 0.02))
+
+LINE = re.compile(r"([+-]?\d+(?:\.\d+)?)\s*$")
+OVER = re.compile(r"^\s*(?:over|o)\b", re.IGNORECASE)
+UNDER = re.compile(r"^\s*(?:under|u)\b", re.IGNORECASE)
+
+def line_family(market_type):
+    """Family of a market whose selections carry a line, "spread" or "total", None for other markets"""
+    if any(market in market_type for market in ["Spread", "Handicap", "Run Line", "Puck Line"]):
+        return "spread"
+    if any(market in market_type for market in ["Total", "Over/Under"]):
+        return "total"
+    return None
+
+def parse_line(text):
+    """The line at the end of a selection or market name, e.g. -1.5, None without one
+
+    Quarter lines split the stake over two lines and are left out.
+    """
+    match = LINE.search(text)
+    if match is None:
+        return None
+    line = float(match.group(1))
+    return line if (line * 2).is_integer() else None
+
+def spread_side(selection, event_sides, position):
+    """Which side of the event a spread selection backs, by name and else by position"""
+    team = LINE.sub("", selection).strip()
+    if team and len(event_sides) == 2:
+        selection_sides = split_sides(team)
+        if selection_sides:
+            tokens = selection_sides[0]
+            first = side_similarity(tokens, event_sides[0])
+            second = side_similarity(tokens, event_sides[1])
+            if first != second:
+                return 0 if first > second else 1
+    return position
+
+def line_quotes(family, event, markets):
+    """Each bookmaker's quotes as (line, odds, bookmaker, selection) overs and unders
+
+    Spreads become thresholds on the first side's winning margin: the first side
+    at -1.5 wins when the margin is over 1.5, the second side at +1.5 when it is
+    under 1.5. That lets spreads and totals be searched the same way.
+    """
+    overs = []
+    unders = []
+    event_sides = split_sides(event) if family == "spread" else None
+
+    for market in markets:
+        if family == "spread" and len(market["odds"]) != 2:
+            continue
+        for position, selection in enumerate(market["odds"]):
+            name = selection["selection"]
+            if selection["odds"] <= 0:
+                continue
+            line = parse_line(name)
+            if line is None:
+                # A market named after its line, e.g. "Handicap -1.5", gives the line of the side the
+                # bookmaker lists first, now last if its selections were reordered; the other side's is the opposite
+                line = parse_line(market["market"])
+                listed_first = len(market["odds"]) - 1 if market.get("sides_swapped") else 0
+                if line is not None and family == "spread" and position != listed_first:
+                    line = -line
+            if line is None:
+                continue
+
+            quote = (line, selection["odds"], market["bookmaker"], name)
+            if family == "total":
+                if OVER.match(name):
+                    overs.append(quote)
+                elif UNDER.match(name):
+                    unders.append(quote)
+            elif spread_side(name, event_sides, position) == 0:
+                overs.append((-line,) + quote[1:])
+            else:
+                unders.append(quote)
+
+    return overs, unders
+
+def best_line_pair(overs, unders, max_loss=MIDDLE_MAX_LOSS):
+    """The best over/under pair covering every result, as (over, under, margin), or None
+
+    An over at one line and an under at the same or a higher line can't both lose.
+    Overs are sorted by line with a running best price, so the best over at or below
+    each under line is one bisect away. Pairs with a margin under 1 are arbitrages
+    and win over anything else. Failing one, the best pair with a gap between the
+    lines is a middle, kept if at worst it loses max_loss of the stake. The two are
+    searched separately, so a cheaper same-line pair that isn't an arbitrage can't
+    hide a middle.
+    """
+    if not overs or not unders:
+        return None
+
+    overs = sorted(overs)
+    over_lines = [quote[0] for quote in overs]
+    best_overs = []
+    for quote in overs:
+        if not best_overs or quote[1] > best_overs[-1][1]:
+            best_overs.append(quote)
+        else:
+            best_overs.append(best_overs[-1])
+
+    best_unders = {}
+    for quote in unders:
+        if quote[0] not in best_unders or quote[1] > best_unders[quote[0]][1]:
+            best_unders[quote[0]] = quote
+
+    arbitrage = None
+    middle = None
+    for line, under in best_unders.items():
+        # Overs at or below the line cover every result with this under
+        index = bisect_right(over_lines, line)
+        if index > 0:
+            over = best_overs[index - 1]
+            margin = 1 / over[1] + 1 / under[1]
+            if margin < 1 and (arbitrage is None or margin < arbitrage[2]):
+                arbitrage = (over, under, margin)
+        # Overs strictly below it also leave a middle
+        index = bisect_left(over_lines, line)
+        if index > 0:
+            over = best_overs[index - 1]
+            margin = 1 / over[1] + 1 / under[1]
+            if middle is None or margin < middle[2]:
+                middle = (over, under, margin)
+
+    if arbitrage is not None:
+        return arbitrage
+    if middle is not None and 1 / middle[2] - 1 > -max_loss:
+        return middle
+    return None
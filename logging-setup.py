@@ -0,0 +1,101 @@
+import os
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from metrics import LOG_RECORDS_DROPPED
+
+# Logging configuration from environment variables
+LOG_FILE = os.environ.get("LOG_FILE", "arbitrage_bot.log")
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+# "text" or "json", one object per line
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+# Rotate the file at this size, or on a schedule such as "midnight" or "H" when LOG_ROTATE_WHEN is set
+LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_ROTATE_WHEN = os.environ.get("LOG_ROTATE_WHEN", "")
+LOG_BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", 5))
+# Records waiting for the writer thread, past this new records are dropped rather than block the caller
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the traceback in its own field"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread, never waiting on a full queue"""
+
+    def prepare(self, record):
+        # Merge the arguments and render the traceback now, while the objects they refer to still hold those values
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+def build_file_handler(path=LOG_FILE, when=LOG_ROTATE_WHEN, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT):
+    if when:
+        return logging.handlers.TimedRotatingFileHandler(path, when=when, backupCount=backup_count, encoding="utf-8", utc=True)
+    return logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+
+listener = None
+
+def setup_logging(level=LOG_LEVEL, log_format=LOG_FORMAT, log_file=LOG_FILE, queue_size=LOG_QUEUE_SIZE):
+    """Route every log record through a queue to a background thread that writes the file and the console
+
+    Logging calls then only cost a put on an in-memory queue, on the scrape and
+    detection threads alike. Calling it again keeps the pipeline already set up.
+    """
+    global listener
+    if listener is not None:
+        return listener
+
+    formatter = JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+    handlers = [build_file_handler(log_file), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records = queue.Queue(maxsize=max(queue_size, 0))
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DroppingQueueHandler(records))
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    # Write out what is still queued on the way down
+    atexit.register(stop_logging)
+    return listener
+
+def stop_logging():
+    global listener
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    listener = None
@@ -1,23 +1,30 @@
 import os
 import time
-import schedule
+import asyncio
 import threading
 import logging
-from flask import Flask
+from collections import deque
+from flask import Flask, Response, request, stream_with_context
 from datetime import datetime
-from scrapers.bet365_scraper import scrape_odds as scrape_bet365
-from scrapers.betmgm_scraper import scrape_odds as scrape_betmgm
-from scrapers.stake_scraper import scrape_odds as scrape_stake
-from arbitrage_finder import find_arbitrage_opportunities
-from email_service import send_email, send_test_email
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.FileHandler("arbitrage_bot.log"), logging.StreamHandler()]
+from scrapers.registry import get_adapters
+from scrapers.engine import iter_sport_odds
+from scrapers.readiness import percentile
+from arbitrage_engine import IncrementalArbitrageEngine
+from refresh_scheduler import RefreshScheduler
+from alert_dedupe import AlertDeduplicator
+from opportunity_feed import OpportunityFeed
+from odds_history import OddsHistory, ODDS_HISTORY
+from email_service import send_email, send_alert, flush_alerts, send_test_email, email_delivery
+from alert_format import format_opportunity_email, format_opportunity_subject
+from logging_setup import setup_logging
+from metrics import (
+    PROFILE_TOKEN, OPPORTUNITIES, ALERTS_SUPPRESSED, SECONDS_SINCE_HEARTBEAT, OPEN_OPPORTUNITIES,
+    EMAIL_QUEUE_SIZE, render_metrics, profile_call
 )
 
+# Configure logging, records are written by a background thread so logging never blocks a scrape
+setup_logging()
+
 logger = logging.getLogger("arbitrage-bot")
 
 # Initialize Flask app for the server
@@ -25,7 +32,27 @@ app = Flask(__name__)
 
 # Global variables
 last_heartbeat = datetime.now()
-is_first_run = True
+
+# Bookmakers to scrape, from the adapter registry
+bookmaker_adapters = get_adapters()
+
+# Keeps quotes between cycles so only markets whose prices moved are re-checked
+arbitrage_engine = IncrementalArbitrageEngine()
+
+# The engine, its index and matcher aren't thread safe, a profiled cycle and the detector share them
+detection_lock = threading.Lock()
+
+# Seconds from a sport page being extracted to the alerts it triggered going out
+alert_latencies = deque(maxlen=500)
+
+# Opportunities already alerted, so a still-open one isn't emailed again every refresh
+alert_deduplicator = AlertDeduplicator()
+
+# Recent opportunity events for the /opportunities endpoints
+opportunity_feed = OpportunityFeed()
+
+# Every scraped quote, appended to disk for replay and analysis
+odds_history = OddsHistory() if ODDS_HISTORY else None
 
 @app.route('/')
 def home():
@@ -36,96 +63,122 @@ def home():
         "status": "active",
         "last_heartbeat": last_heartbeat.isoformat(),
         "seconds_since_heartbeat": time_since_last_heartbeat,
+        "alerts": alert_deduplicator.stats(),
         "version": "1.0.0"
     }
 
+@app.route('/opportunities')
+def opportunities():
+    """Recent opportunity events, newest first. Filters: sport, min_profit, open=1, limit"""
+    min_profit = request.args.get("min_profit", type=float)
+    limit = max(min(request.args.get("limit", 100, type=int), 1000), 1)
+    events = opportunity_feed.query(
+        sport=request.args.get("sport"),
+        min_profit=min_profit,
+        open_only=request.args.get("open") == "1",
+        limit=limit
+    )
+    return {"opportunities": events}
+
+@app.route('/opportunities/stream')
+def opportunity_stream():
+    """Push every opportunity open, update and close event as server-sent events"""
+    # A reconnecting EventSource sends the header, other clients can pass ?since=, 0 replays the buffer
+    last_id = request.headers.get("Last-Event-ID", type=int)
+    if last_id is None:
+        last_id = request.args.get("since", type=int)
+    return Response(
+        stream_with_context(opportunity_feed.stream(last_id)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/metrics')
+def metrics():
+    """Stage timings and counters in the Prometheus text format"""
+    SECONDS_SINCE_HEARTBEAT.set((datetime.now() - last_heartbeat).total_seconds())
+    OPEN_OPPORTUNITIES.set(len(arbitrage_engine.open_opportunities))
+    EMAIL_QUEUE_SIZE.set(email_delivery.queue.qsize())
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/metrics/profile')
+def profile():
+    """Profile one full cycle on this thread, ?token=PROFILE_TOKEN, &format=html for pyinstrument"""
+    if not PROFILE_TOKEN or request.args.get("token") != PROFILE_TOKEN:
+        return {"error": "profiling is disabled"}, 404
+    result = profile_call(run_profiled_cycle, use_pyinstrument=request.args.get("format") == "html")
+    if result is None:
+        return {"error": "a profile is already running"}, 409
+    report, content_type = result
+    return Response(report, mimetype=content_type)
+
 def heartbeat():
     """Updates the last heartbeat time"""
     global last_heartbeat
     last_heartbeat = datetime.now()
     logger.info("Heartbeat sent at %s", last_heartbeat.isoformat())
 
-def run_arbitrage_check():
-    """Main function to check for arbitrage opportunities across bookmakers"""
-    global is_first_run
-    logger.info("Starting arbitrage check")
-    
-    try:
-        # Send test email on first run
-        if is_first_run:
-            logger.info("First run detected, sending test email")
-            send_test_email()
-            is_first_run = False
-        
-        # Scrape odds from all bookmakers
-        bet365_odds = scrape_bet365()
-        betmgm_odds = scrape_betmgm()
-        stake_odds = scrape_stake()
-        
-        # Find arbitrage opportunities
-        opportunities = find_arbitrage_opportunities(bet365_odds, betmgm_odds, stake_odds)
+def run_profiled_cycle():
+    """One full cycle with every scrape and check on the calling thread, so a profiler sees all of it"""
+    for adapter in bookmaker_adapters:
+        for sport, sport_odds in iter_sport_odds(adapter):
+            handle_sport_odds(adapter["name"], sport, sport_odds, time.time())
+    flush_alerts()
+
+def handle_sport_odds(name, sport, sport_odds, extracted_at):
+    """Check one freshly scraped bookmaker sport for arbitrage and alert on what it opened or moved"""
+    with detection_lock:
+        try:
+            # Only markets this sport's quotes moved are re-checked
+            events = arbitrage_engine.update({name: {sport: sport_odds}})
+            # Subscribers hear about every change before any email goes out
+            for event in events:
+                opportunity_feed.publish(event["type"], event["key"], event["opportunity"])
+                OPPORTUNITIES.inc(event["type"])
         
-        # Send email if opportunities found
-        if opportunities:
-            logger.info(f"Found {len(opportunities)} arbitrage opportunities!")
-            for opp in opportunities:
-                send_email(
-                    subject=f"Arbitrage Opportunity: {opp['profit_percentage']:.2f}% profit",
+            for event in events:
+                opp = event["opportunity"]
+                logger.info(f"Opportunity {event['type']}: {opp['event']} {opp['market']} at {opp['profit_percentage']:.2f}%")
+                if event["type"] == "close":
+                    alert_deduplicator.forget(opp)
+                    continue
+                if not alert_deduplicator.should_alert(opp):
+                    ALERTS_SUPPRESSED.inc()
+                    continue
+            
+                send_alert(
+                    subject=format_opportunity_subject(opp),
                     body=format_opportunity_email(opp)
                 )
-        else:
-            logger.info("No arbitrage opportunities found in this run")
+                latency = time.time() - extracted_at
+                alert_latencies.append(latency)
+                logger.info(
+                    f"Alert for {opp['event']} {opp['market']} queued {latency:.1f}s after {name} {sport} was extracted "
+                    f"(p50 {percentile(alert_latencies, 0.5):.1f}s, p95 {percentile(alert_latencies, 0.95):.1f}s)"
+                )
             
-    except Exception as e:
-        logger.error(f"Error in arbitrage check: {str(e)}", exc_info=True)
-        send_email(
-            subject="ERROR: Sports Arbitrage Bot Needs Attention",
-            body=f"The bot encountered an error: {str(e)}\n\nPlease check the logs and fix the issue."
-        )
-
-def format_opportunity_email(opportunity):
-    """Format the arbitrage opportunity details for email"""
-    return f"""Arbitrage Opportunity Found!
-
-Profit Percentage: {opportunity['profit_percentage']:.2f}%
-
-Event: {opportunity['event']}
-Sport: {opportunity['sport']}
-Market: {opportunity['market']}
-
-Bet Details:
-1. {opportunity['bet1']['bookmaker']} - {opportunity['bet1']['selection']} @ {opportunity['bet1']['odds']} 
-   Stake: ${opportunity['bet1']['stake']:.2f} ({opportunity['bet1']['stake_percentage']:.1f}% of total)
-
-2. {opportunity['bet2']['bookmaker']} - {opportunity['bet2']['selection']} @ {opportunity['bet2']['odds']}
-   Stake: ${opportunity['bet2']['stake']:.2f} ({opportunity['bet2']['stake_percentage']:.1f}% of total)
-
-Total Stake: ${opportunity['total_stake']:.2f}
-Expected Return: ${opportunity['expected_return']:.2f}
-Expected Profit: ${opportunity['expected_profit']:.2f}
-
-Time Found: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-Good luck!
-"""
+        except Exception as e:
+            logger.error(f"Error in arbitrage check: {str(e)}", exc_info=True)
+            send_email(
+                subject="ERROR: Sports Arbitrage Bot Needs Attention",
+                body=f"The bot encountered an error: {str(e)}\n\nPlease check the logs and fix the issue."
+            )
+
+        # Recorded after the alerts are out, so the disk never delays them
+        if odds_history is not None:
+            try:
+                odds_history.append(name, sport, sport_odds, now=extracted_at)
+            except Exception as e:
+                logger.error(f"Failed to record odds history: {str(e)}", exc_info=True)
 
 def schedule_jobs():
-    """Schedule the jobs for the bot"""
-    # Get check interval from environment or use default
-    check_interval = int(os.environ.get("SCRAPE_INTERVAL", 2))
-    heartbeat_interval = int(os.environ.get("HEARTBEAT_INTERVAL", 3))
-    
-    schedule.every(check_interval).minutes.do(run_arbitrage_check)
-    schedule.every(heartbeat_interval).minutes.do(heartbeat)
-    
-    # Run immediately at startup
-    run_arbitrage_check()
-    heartbeat()
+    """Refresh every bookmaker sport on its own interval, with an independent heartbeat"""
+    logger.info("Starting scheduler, sending test email")
+    send_test_email([adapter["name"] for adapter in bookmaker_adapters])
     
-    # Keep running the scheduled jobs
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    # The digest of batched alerts goes out once every bookmaker sport has been refreshed
+    scheduler = RefreshScheduler(bookmaker_adapters, handle_sport_odds, heartbeat=heartbeat, on_round=flush_alerts)
+    asyncio.run(scheduler.run())
 
 if __name__ == "__main__":
     # Start the scheduling in a separate thread
@@ -0,0 +1,188 @@
+import io
+import os
+import time
+import pstats
+import logging
+import cProfile
+import threading
+from contextlib import contextmanager
+
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
+logger = logging.getLogger("arbitrage-bot.metrics")
+
+# Token the /metrics/profile endpoint requires, profiling is off while it is unset
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+
+# Histogram buckets in seconds, from a quick DOM query up to a slow page load
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_labels(names, values, extra=None):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """A named metric with one series per combination of label values"""
+
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.series = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def key(self, label_values):
+        if len(label_values) != len(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {label_values}")
+        return tuple(str(value) for value in label_values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            series = sorted(self.series.items())
+        for label_values, value in series:
+            lines.extend(self.render_series(label_values, value))
+        return lines
+
+    def render_series(self, label_values, value):
+        return [f"{self.name}{format_labels(self.labels, label_values)} {format_value(value)}"]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *label_values, amount=1):
+        key = self.key(label_values)
+        with self.lock:
+            self.series[key] = self.series.get(key, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, *label_values):
+        key = self.key(label_values)
+        with self.lock:
+            self.series[key] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, *label_values):
+        key = self.key(label_values)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][index] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        """Observe how long the with block took, also when it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def render_series(self, label_values, series):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, series["counts"]):
+            cumulative += count
+            labels = format_labels(self.labels, label_values, ("le", format_value(float(bound))))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = format_labels(self.labels, label_values)
+        lines.append(f"{self.name}_sum{labels} {format_value(series['sum'])}")
+        lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+# Every metric, in the order they were defined
+REGISTRY = []
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# Scrape stages
+DRIVER_INIT_SECONDS = Histogram("arbitrage_driver_init_seconds", "Time to start a Chrome driver")
+PAGE_LOAD_SECONDS = Histogram("arbitrage_page_load_seconds", "Time driver.get took to load a sport page", ["bookmaker"])
+READINESS_WAIT_SECONDS = Histogram("arbitrage_readiness_wait_seconds", "Time waiting for a sport page's odds to render and settle", ["bookmaker"])
+EXTRACTION_SECONDS = Histogram("arbitrage_extraction_seconds", "Time to extract a loaded sport page's odds", ["bookmaker", "sport"])
+MARKETS_SCRAPED = Counter("arbitrage_markets_scraped_total", "Markets extracted from sport pages", ["bookmaker", "sport"])
+SCRAPE_TIMEOUTS = Counter("arbitrage_scrape_timeouts_total", "Sport page loads that timed out", ["bookmaker"])
+SCRAPE_ERRORS = Counter("arbitrage_scrape_errors_total", "Sport page loads that failed", ["bookmaker"])
+
+# Detection stages, "incremental" for the live engine and "full" for find_arbitrage_opportunities
+DETECTION_SECONDS = Histogram("arbitrage_detection_seconds", "Time spent grouping quotes and evaluating markets for arbitrage", ["finder", "stage"])
+OPPORTUNITIES = Counter("arbitrage_opportunities_total", "Opportunity events from detection", ["type"])
+ALERTS_SUPPRESSED = Counter("arbitrage_alerts_suppressed_total", "Opportunity alerts skipped as repeats")
+
+# Email delivery
+EMAIL_SEND_SECONDS = Histogram("arbitrage_email_send_seconds", "Time to hand one email to the SMTP server")
+EMAILS = Counter("arbitrage_emails_total", "Email delivery attempts by result", ["result"])
+
+# Logging
+LOG_RECORDS_DROPPED = Counter("arbitrage_log_records_dropped_total", "Log records dropped because the writer thread fell behind")
+
+# Point in time values, set when /metrics is scraped
+SECONDS_SINCE_HEARTBEAT = Gauge("arbitrage_seconds_since_heartbeat", "Seconds since the last heartbeat")
+OPEN_OPPORTUNITIES = Gauge("arbitrage_open_opportunities", "Opportunities currently open")
+EMAIL_QUEUE_SIZE = Gauge("arbitrage_email_queue_size", "Emails waiting in the delivery queue")
+
+profile_lock = threading.Lock()
+
+def profile_call(function, use_pyinstrument=False, sort="cumulative", limit=80):
+    """Run function under cProfile, or pyinstrument if asked and installed, returning (report, content type)
+
+    Only one profile runs at a time, returns None if another is already running.
+    """
+    if not profile_lock.acquire(blocking=False):
+        return None
+    try:
+        if use_pyinstrument and Profiler is not None:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                function()
+            finally:
+                profiler.stop()
+            return profiler.output_html(), "text/html"
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            function()
+        finally:
+            profiler.disable()
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats(sort).print_stats(limit)
+        return report.getvalue(), "text/plain"
+    finally:
+        profile_lock.release()
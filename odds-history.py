@@ -0,0 +1,321 @@
+import os
+import json
+import mmap
+import time
+import shutil
+import logging
+import threading
+from array import array
+from datetime import datetime, timezone
+
+logger = logging.getLogger("arbitrage-bot.history")
+
+# Record every scraped quote to HISTORY_DIR, one directory per UTC day
+ODDS_HISTORY = os.environ.get("ODDS_HISTORY", "1") == "1"
+HISTORY_DIR = os.environ.get("HISTORY_DIR", "history")
+# Days of history kept before a day is deleted
+HISTORY_RETENTION_DAYS = int(os.environ.get("HISTORY_RETENTION_DAYS", 120))
+
+# Column name -> array typecode. Strings are stored as ids into the day's dictionaries.
+COLUMNS = {
+    "timestamp": "d",
+    "bookmaker": "H",
+    "sport": "H",
+    "event": "I",
+    "market": "I",
+    "selection": "I",
+    "odds": "f"
+}
+STRING_COLUMNS = ["bookmaker", "sport", "event", "market", "selection"]
+COMPACTED_MARKER = ".compacted"
+# Siblings of a day directory while it is compacted: the new copy being written, and the old one being swapped out
+COMPACTING_SUFFIX = ".compacting"
+REPLACED_SUFFIX = ".replaced"
+
+def day_of(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d")
+
+class SegmentWriter:
+    """Appends quotes to one day's column files and string dictionaries"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.strings = {}
+        self.string_files = {}
+        for column in STRING_COLUMNS:
+            path = os.path.join(directory, f"{column}.strings")
+            self.strings[column] = {value: index for index, value in enumerate(read_strings(path))}
+            self.string_files[column] = open(path, "a", encoding="utf-8")
+        self.column_files = {column: open(os.path.join(directory, f"{column}.col"), "ab") for column in COLUMNS}
+
+    def intern(self, column, value):
+        ids = self.strings[column]
+        string_id = ids.get(value)
+        if string_id is None:
+            string_id = len(ids)
+            ids[value] = string_id
+            self.string_files[column].write(json.dumps(value) + "\n")
+        return string_id
+
+    def append(self, columns):
+        """Append arrays of equal length, one per column"""
+        for column in STRING_COLUMNS:
+            self.string_files[column].flush()
+        # Dictionaries are flushed first, so a column never references a string that isn't on disk
+        for column, values in columns.items():
+            values.tofile(self.column_files[column])
+            self.column_files[column].flush()
+
+    def close(self):
+        for f in list(self.string_files.values()) + list(self.column_files.values()):
+            f.close()
+
+def column_sizes(directory):
+    return {column: os.path.getsize(os.path.join(directory, f"{column}.col")) for column in COLUMNS
+            if os.path.exists(os.path.join(directory, f"{column}.col"))}
+
+def read_strings(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+class Segment:
+    """One day of history, read through memory maps without loading the columns into RAM"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.day = os.path.basename(directory)
+        self.maps = []
+        # Every memoryview over a map, released before the maps are closed
+        self.views = []
+        raw = {}
+        for column, typecode in COLUMNS.items():
+            path = os.path.join(directory, f"{column}.col")
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            if size == 0:
+                raw[column] = memoryview(b"").cast(typecode)
+                continue
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.maps.append(mapped)
+            view = self.track(memoryview(mapped))
+            itemsize = array(typecode).itemsize
+            raw[column] = self.track(self.track(view[:size - size % itemsize]).cast(typecode))
+        # A write cut short by a crash can leave columns of different lengths
+        self.length = min(len(values) for values in raw.values())
+        self.columns = {column: self.track(values[:self.length]) for column, values in raw.items()}
+        self.strings = {column: read_strings(os.path.join(directory, f"{column}.strings")) for column in STRING_COLUMNS}
+
+    def track(self, view):
+        self.views.append(view)
+        return view
+
+    def __len__(self):
+        return self.length
+
+    def column(self, name):
+        """Raw values of a column, string columns as dictionary ids"""
+        return self.columns[name]
+
+    def rows(self, start=0, stop=None):
+        """Quotes as (timestamp, bookmaker, sport, event, market, selection, odds) tuples"""
+        stop = self.length if stop is None else min(stop, self.length)
+        timestamps, odds = self.columns["timestamp"], self.columns["odds"]
+        ids = [self.columns[column] for column in STRING_COLUMNS]
+        strings = [self.strings[column] for column in STRING_COLUMNS]
+        for row in range(start, stop):
+            names = tuple(names[values[row]] for values, names in zip(ids, strings))
+            # Odds are stored as float32, round off the noise it adds to decimal odds
+            yield (timestamps[row],) + names + (round(odds[row], 4),)
+
+    def close(self):
+        for view in reversed(self.views):
+            view.release()
+        self.views = []
+        for mapped in self.maps:
+            mapped.close()
+        self.maps = []
+
+class OddsHistory:
+    """Append-only columnar odds history, one directory per UTC day
+
+    Every quote becomes one row of fixed-width columns (timestamp, bookmaker,
+    sport, event, market, selection, odds), strings interned into per-day
+    dictionaries, so a day stays self-contained and can be deleted on its own.
+    Closed days are compacted to the first and last quote of every run of
+    unchanged odds, which keeps how long each price was up, and days past the
+    retention are deleted.
+    """
+
+    def __init__(self, directory=HISTORY_DIR, retention_days=HISTORY_RETENTION_DAYS):
+        self.directory = directory
+        self.retention_days = retention_days
+        self.writer = None
+        self.writer_day = None
+        self.lock = threading.Lock()
+        self.maintenance = None
+
+    def append(self, bookmaker, sport, markets, now=None):
+        """Append every selection of a bookmaker sport's scraped markets, returning the rows written"""
+        now = now if now is not None else time.time()
+        with self.lock:
+            writer = self.writer_for(day_of(now))
+            columns = {column: array(typecode) for column, typecode in COLUMNS.items()}
+            bookmaker_id = writer.intern("bookmaker", bookmaker)
+            sport_id = writer.intern("sport", sport)
+
+            for market in markets:
+                event_id = writer.intern("event", market["event"])
+                market_id = writer.intern("market", market["market"])
+                for selection in market["odds"]:
+                    columns["timestamp"].append(now)
+                    columns["bookmaker"].append(bookmaker_id)
+                    columns["sport"].append(sport_id)
+                    columns["event"].append(event_id)
+                    columns["market"].append(market_id)
+                    columns["selection"].append(writer.intern("selection", selection["selection"]))
+                    columns["odds"].append(selection["odds"])
+
+            writer.append(columns)
+            return len(columns["timestamp"])
+
+    def writer_for(self, day):
+        if self.writer_day != day:
+            if self.writer is not None:
+                self.writer.close()
+            self.writer = SegmentWriter(os.path.join(self.directory, day))
+            self.writer_day = day
+            # A new day closes the previous one, compact and rotate off the write path
+            self.start_maintenance()
+        return self.writer
+
+    def days(self):
+        """Days with history, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if not name.endswith((COMPACTING_SUFFIX, REPLACED_SUFFIX)) and os.path.isdir(os.path.join(self.directory, name))
+        )
+
+    def open_day(self, day):
+        """Memory-map one day of history for reading"""
+        return Segment(os.path.join(self.directory, day))
+
+    def start_maintenance(self):
+        if self.maintenance is not None and self.maintenance.is_alive():
+            return
+        self.maintenance = threading.Thread(target=self.maintain, name="history-maintenance", daemon=True)
+        self.maintenance.start()
+
+    def maintain(self, now=None):
+        """Delete days past the retention and compact closed days that haven't been yet"""
+        now = now if now is not None else time.time()
+        oldest = day_of(now - self.retention_days * 86400)
+        try:
+            self.recover()
+            for day in self.days():
+                if day < oldest:
+                    shutil.rmtree(os.path.join(self.directory, day), ignore_errors=True)
+                    logger.info(f"Deleted odds history for {day}")
+                    continue
+                with self.lock:
+                    closed = day < day_of(now) and day != self.writer_day
+                if closed:
+                    self.compact(day)
+        except Exception as e:
+            logger.error(f"Odds history maintenance failed: {str(e)}", exc_info=True)
+
+    def compact(self, day):
+        """Rewrite a closed day keeping only the first and last quote of each run of unchanged odds
+
+        The compacted day is written to a sibling directory and swapped in whole,
+        so a reader or a crash never sees some columns compacted and others not.
+        """
+        directory = os.path.join(self.directory, day)
+        if os.path.exists(os.path.join(directory, COMPACTED_MARKER)):
+            return 0
+        sizes = column_sizes(directory)
+
+        segment = Segment(directory)
+        try:
+            keep = array("B", bytes(len(segment)))
+            # (bookmaker, event, market, selection) -> (odds, first row of the run, last row of the run)
+            runs = {}
+            bookmakers, events, markets = segment.column("bookmaker"), segment.column("event"), segment.column("market")
+            selections, odds = segment.column("selection"), segment.column("odds")
+            for row in range(len(segment)):
+                key = (bookmakers[row], events[row], markets[row], selections[row])
+                run = runs.get(key)
+                if run is not None and run[0] == odds[row]:
+                    runs[key] = (run[0], run[1], row)
+                    continue
+                if run is not None:
+                    keep[run[1]] = keep[run[2]] = 1
+                runs[key] = (odds[row], row, row)
+            for _, first, last in runs.values():
+                keep[first] = keep[last] = 1
+
+            compacted = directory + COMPACTING_SUFFIX
+            shutil.rmtree(compacted, ignore_errors=True)
+            os.makedirs(compacted)
+            for column in STRING_COLUMNS:
+                source = os.path.join(directory, f"{column}.strings")
+                if os.path.exists(source):
+                    shutil.copyfile(source, os.path.join(compacted, f"{column}.strings"))
+            for column, typecode in COLUMNS.items():
+                values = segment.column(column)
+                kept = array(typecode, (values[row] for row in range(len(segment)) if keep[row]))
+                with open(os.path.join(compacted, f"{column}.col"), "wb") as f:
+                    kept.tofile(f)
+                    f.flush()
+                    os.fsync(f.fileno())
+            # The marker goes in last, a copy with it is complete
+            open(os.path.join(compacted, COMPACTED_MARKER), "w").close()
+            rows_before, rows_after = len(segment), sum(keep)
+        finally:
+            segment.close()
+
+        with self.lock:
+            # Quotes stamped with this day arrived while it was compacted, keep it as it is for the next pass
+            if self.writer_day == day or column_sizes(directory) != sizes:
+                shutil.rmtree(compacted, ignore_errors=True)
+                return 0
+            # A directory can't be renamed over a non-empty one, so the old day is moved aside first.
+            # recover() finishes the swap if the process dies between the two renames.
+            replaced = directory + REPLACED_SUFFIX
+            os.rename(directory, replaced)
+            os.rename(compacted, directory)
+        shutil.rmtree(replaced, ignore_errors=True)
+        logger.info(f"Compacted odds history for {day} from {rows_before} to {rows_after} quotes")
+        return rows_before - rows_after
+
+    def recover(self):
+        """Finish or undo compactions a crash interrupted"""
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(REPLACED_SUFFIX):
+                directory = path[:-len(REPLACED_SUFFIX)]
+                compacted = directory + COMPACTING_SUFFIX
+                if not os.path.exists(directory):
+                    if os.path.exists(os.path.join(compacted, COMPACTED_MARKER)):
+                        os.rename(compacted, directory)
+                    else:
+                        os.rename(path, directory)
+                        continue
+                shutil.rmtree(path, ignore_errors=True)
+        # Copies left half written, the day they were made from is still in place
+        for name in os.listdir(self.directory):
+            if name.endswith(COMPACTING_SUFFIX):
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def close(self):
+        with self.lock:
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
+                self.writer_day = None
@@ -0,0 +1,200 @@
+import logging
+from array import array
+from arbitrage_finder import build_opportunity, market_outcome_count
+
+logger = logging.getLogger("arbitrage-bot.odds-index")
+
+INFINITY = float("inf")
+
+class OddsIndex:
+    """Best price and bookmaker per (sport, event, market, outcome), updated in place
+
+    Markets are keyed like find_arbitrage_opportunities groups them and outcomes
+    by position, only for markets check_arbitrage knows how to check. Each market
+    owns a run of slots in flat arrays holding the best odds, the bookmaker
+    offering them and the implied probability sum of the whole market, so an
+    arbitrage check is a lookup over the market's outcomes instead of a rescan
+    of every bookmaker's quote.
+    """
+
+    def __init__(self):
+        self.market_ids = {}
+        self.market_keys = []
+        self.bookmaker_ids = {}
+        self.bookmakers = []
+        # Per market: outcome count, first slot and sum of 1/best odds
+        self.arity = array("b")
+        self.offsets = array("q")
+        self.implied = array("d")
+        # Per outcome slot: best odds, bookmaker id and that bookmaker's selection name
+        self.best_odds = array("d")
+        self.best_bookmaker = array("h")
+        self.best_selection = []
+        # Per market: {bookmaker id: (odds tuple, selection name tuple)}, to recompute a best price that moved
+        self.quotes = []
+        # Released market ids by outcome count, reused so the arrays don't grow forever
+        self.free_ids = {}
+
+    def __len__(self):
+        return len(self.market_ids)
+
+    def __contains__(self, key):
+        return key in self.market_ids
+
+    def update(self, key, bookmaker, selections):
+        """Store a bookmaker's quote for a (sport, event, market) key, returning whether a best price changed"""
+        arity = market_outcome_count(key[2])
+        if arity is None:
+            return False
+        if len(selections) != arity:
+            # check_arbitrage ignores quotes with the wrong number of outcomes
+            return self.remove(key, bookmaker)
+
+        market_id = self.market_ids.get(key)
+        if market_id is None:
+            market_id = self._allocate(key, arity)
+        book = self._bookmaker_id(bookmaker)
+
+        quote = (
+            tuple(selection["odds"] for selection in selections),
+            tuple(selection["selection"] for selection in selections)
+        )
+        quotes = self.quotes[market_id]
+        if quotes.get(book) == quote:
+            return False
+        quotes[book] = quote
+
+        odds, names = quote
+        base = self.offsets[market_id]
+        changed = False
+        for outcome in range(arity):
+            slot = base + outcome
+            if odds[outcome] > self.best_odds[slot]:
+                self.best_odds[slot] = odds[outcome]
+                self.best_bookmaker[slot] = book
+                self.best_selection[slot] = names[outcome]
+                changed = True
+            elif self.best_bookmaker[slot] == book:
+                # The best bookmaker re-quoted this outcome, someone else may now be best
+                changed |= self._rescan(market_id, outcome)
+
+        if changed:
+            self._refresh_implied(market_id)
+        return changed
+
+    def remove(self, key, bookmaker):
+        """Drop a bookmaker's quote for a key, returning whether a best price changed"""
+        market_id = self.market_ids.get(key)
+        book = self.bookmaker_ids.get(bookmaker)
+        if market_id is None or book is None or book not in self.quotes[market_id]:
+            return False
+
+        quotes = self.quotes[market_id]
+        del quotes[book]
+        if not quotes:
+            self._release(key, market_id)
+            return True
+
+        base = self.offsets[market_id]
+        changed = False
+        for outcome in range(self.arity[market_id]):
+            if self.best_bookmaker[base + outcome] == book:
+                changed |= self._rescan(market_id, outcome)
+
+        if changed:
+            self._refresh_implied(market_id)
+        return changed
+
+    def bookmaker_count(self, key):
+        """Number of bookmakers quoting a key"""
+        market_id = self.market_ids.get(key)
+        return 0 if market_id is None else len(self.quotes[market_id])
+
+    def best_prices(self, key):
+        """Best (odds, bookmaker, selection) per outcome for a key, None if it isn't indexed"""
+        market_id = self.market_ids.get(key)
+        if market_id is None:
+            return None
+        base = self.offsets[market_id]
+        return [
+            (self.best_odds[slot], self.bookmakers[self.best_bookmaker[slot]], self.best_selection[slot])
+            for slot in range(base, base + self.arity[market_id])
+        ]
+
+    def implied_probability(self, key):
+        """Sum of 1/best odds over a key's outcomes, infinity if an outcome has no price"""
+        market_id = self.market_ids.get(key)
+        return INFINITY if market_id is None else self.implied[market_id]
+
+    def markets_below(self, threshold):
+        """Keys whose implied probability sum is below the threshold, e.g. 1.0 for arbitrages"""
+        keys = self.market_keys
+        return [keys[market_id] for market_id, implied in enumerate(self.implied) if implied < threshold]
+
+    def opportunity(self, key, total_stake=1000):
+        """The arbitrage on a key as find_arbitrage_opportunities reports it, or None"""
+        # Like the finder, a market needs quotes from at least two bookmakers
+        if self.bookmaker_count(key) < 2:
+            return None
+        sport, event, market_type = key
+        return build_opportunity(sport, event, market_type, self.best_prices(key), total_stake)
+
+    def _bookmaker_id(self, bookmaker):
+        book = self.bookmaker_ids.get(bookmaker)
+        if book is None:
+            book = len(self.bookmakers)
+            self.bookmaker_ids[bookmaker] = book
+            self.bookmakers.append(bookmaker)
+        return book
+
+    def _allocate(self, key, arity):
+        free = self.free_ids.get(arity)
+        if free:
+            market_id = free.pop()
+            self.market_keys[market_id] = key
+        else:
+            market_id = len(self.market_keys)
+            self.market_keys.append(key)
+            self.arity.append(arity)
+            self.offsets.append(len(self.best_odds))
+            self.implied.append(INFINITY)
+            self.quotes.append({})
+            self.best_odds.extend([0.0] * arity)
+            self.best_bookmaker.extend([-1] * arity)
+            self.best_selection.extend([None] * arity)
+        self.market_ids[key] = market_id
+        return market_id
+
+    def _release(self, key, market_id):
+        del self.market_ids[key]
+        self.market_keys[market_id] = None
+        self.implied[market_id] = INFINITY
+        base = self.offsets[market_id]
+        for slot in range(base, base + self.arity[market_id]):
+            self.best_odds[slot] = 0.0
+            self.best_bookmaker[slot] = -1
+            self.best_selection[slot] = None
+        self.free_ids.setdefault(self.arity[market_id], []).append(market_id)
+
+    def _rescan(self, market_id, outcome):
+        slot = self.offsets[market_id] + outcome
+        previous = (self.best_odds[slot], self.best_bookmaker[slot], self.best_selection[slot])
+
+        best = (0.0, -1, None)
+        for book, (odds, names) in self.quotes[market_id].items():
+            if odds[outcome] > best[0]:
+                best = (odds[outcome], book, names[outcome])
+
+        self.best_odds[slot], self.best_bookmaker[slot], self.best_selection[slot] = best
+        return best != previous
+
+    def _refresh_implied(self, market_id):
+        base = self.offsets[market_id]
+        total = 0.0
+        for slot in range(base, base + self.arity[market_id]):
+            odds = self.best_odds[slot]
+            if odds <= 0:
+                total = INFINITY
+                break
+            total += 1 / odds
+        self.implied[market_id] = total
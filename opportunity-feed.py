@@ -0,0 +1,90 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger("arbitrage-bot.feed")
+
+# Recent opportunity events kept in memory for queries and reconnecting subscribers
+FEED_SIZE = int(os.environ.get("OPPORTUNITY_FEED_SIZE", 1000))
+# Seconds between keep-alive comments on an idle stream
+STREAM_KEEPALIVE = float(os.environ.get("STREAM_KEEPALIVE", 15))
+
+class OpportunityFeed:
+    """Ring buffer of opportunity open, update and close events that any number of clients can follow
+
+    Events get increasing ids, so a subscriber that reconnects with the last id
+    it saw picks up where it left off, as long as that is still in the buffer.
+    The currently open opportunities are kept alongside for queries.
+    """
+
+    def __init__(self, size=FEED_SIZE):
+        self.events = deque(maxlen=size)
+        self.open = {}
+        self.next_id = 1
+        self.changed = threading.Condition()
+
+    def publish(self, event_type, key, opportunity, now=None):
+        """Add an engine event and wake every subscriber"""
+        detected_at = now if now is not None else time.time()
+        with self.changed:
+            # Ids are handed out under the lock, two publishers never share one
+            event = {"id": self.next_id, "type": event_type, "detected_at": detected_at, "opportunity": opportunity}
+            self.next_id += 1
+            self.events.append(event)
+            if event_type == "close":
+                self.open.pop(key, None)
+            else:
+                self.open[key] = event
+            self.changed.notify_all()
+        return event
+
+    def since(self, last_id):
+        """Buffered events newer than last_id, oldest first"""
+        with self.changed:
+            return [event for event in self.events if event["id"] > last_id]
+
+    def wait(self, last_id, timeout):
+        """Events newer than last_id, waiting up to timeout seconds for one to arrive"""
+        with self.changed:
+            self.changed.wait_for(lambda: self.next_id - 1 > last_id, timeout)
+            return [event for event in self.events if event["id"] > last_id]
+
+    def query(self, sport=None, min_profit=None, open_only=False, limit=100):
+        """Most recent events, or the open opportunities' latest events, newest first"""
+        if limit <= 0:
+            return []
+        with self.changed:
+            events = list(self.open.values()) if open_only else list(self.events)
+
+        events.sort(key=lambda event: event["id"], reverse=True)
+        matched = []
+        for event in events:
+            opportunity = event["opportunity"]
+            if sport and opportunity["sport"] != sport:
+                continue
+            if min_profit is not None and opportunity["profit_percentage"] < min_profit:
+                continue
+            matched.append(event)
+            if len(matched) >= limit:
+                break
+        return matched
+
+    def stream(self, last_id=None, keepalive=STREAM_KEEPALIVE):
+        """Server-sent event lines for every event after last_id, or from now when it is None, forever"""
+        if last_id is None:
+            # New subscribers start from now, reconnecting ones from where they left off
+            with self.changed:
+                last_id = self.next_id - 1
+
+        yield "retry: 2000\n\n"
+        while True:
+            events = self.wait(last_id, keepalive)
+            if not events:
+                yield ": keep-alive\n\n"
+                continue
+            for event in events:
+                last_id = event["id"]
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
@@ -0,0 +1,282 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from scrapers.driver_pool import POOL_SIZE
+from scrapers.engine import scrape_executor, scrape_sport_once, get_scrape_deadline, new_scrape_stats
+from arbitrage_engine import QUOTE_TTL
+
+logger = logging.getLogger("arbitrage-bot.scheduler")
+
+# Sports of one bookmaker scraped at once, 1 keeps each site to one page at a time
+BOOKMAKER_CONCURRENCY = int(os.environ.get("SCRAPE_BOOKMAKER_CONCURRENCY", 1))
+# Minutes between heartbeats
+HEARTBEAT_INTERVAL = float(os.environ.get("HEARTBEAT_INTERVAL", 3))
+# Page loads per minute shared by every bookmaker sport, 0 refreshes each on its fixed interval instead
+SCRAPE_BUDGET = float(os.environ.get("SCRAPE_BUDGET", 0))
+# Under a budget, no bookmaker sport is refreshed sooner or, before its quotes expire, later than this, in seconds
+REFRESH_MIN_AGE = float(os.environ.get("REFRESH_MIN_AGE", 20))
+REFRESH_MAX_AGE = float(os.environ.get("REFRESH_MAX_AGE", QUOTE_TTL * 0.8))
+# Share of markets assumed to change per minute before a bookmaker sport has been seen twice, and at least
+CHANGE_RATE_FLOOR = 0.01
+# Weight of the latest observation in the smoothed change rate
+CHANGE_RATE_SMOOTHING = 0.3
+
+class RefreshPriorities:
+    """Ranks bookmaker sports by how likely a refresh is to find a new arbitrage
+
+    Tracks how fast each one's odds move, as the smoothed share of markets changed
+    per minute, and how soon its events start. Priority grows with the time since
+    the last refresh, weighted by both: a live game with moving prices is due again
+    within seconds, a quiet card weeks out only before its quotes would expire.
+    """
+
+    def __init__(self, min_age=REFRESH_MIN_AGE, max_age=REFRESH_MAX_AGE):
+        self.min_age = min_age
+        self.max_age = max_age
+        # (bookmaker, sport) -> {"refreshed_at", "change_rate", "signatures", "live", "next_start"}
+        self.groups = {}
+
+    def observe(self, name, sport, sport_odds, now=None):
+        """Record a refresh and how many of its markets changed since the last one"""
+        now = now if now is not None else time.time()
+        group = self.groups.setdefault((name, sport), {
+            "refreshed_at": None, "change_rate": None, "signatures": {}, "live": 0, "next_start": None
+        })
+
+        signatures = {
+            (market["event"], market["market"]): tuple(selection["odds"] for selection in market["odds"])
+            for market in sport_odds
+        }
+        previous = group["signatures"]
+        # A failed page comes back empty, that isn't every market closing at once
+        if previous and signatures and group["refreshed_at"] is not None:
+            changed = sum(1 for key, odds in signatures.items() if previous.get(key) != odds)
+            changed += sum(1 for key in previous if key not in signatures)
+            minutes = max(now - group["refreshed_at"], 1.0) / 60
+            rate = changed / max(len(signatures), len(previous)) / minutes
+            if group["change_rate"] is None:
+                group["change_rate"] = rate
+            else:
+                group["change_rate"] += CHANGE_RATE_SMOOTHING * (rate - group["change_rate"])
+
+        starts = [market["starts_at"] for market in sport_odds if market.get("starts_at", 0) > now]
+        group["signatures"] = signatures
+        group["refreshed_at"] = now
+        group["live"] = len({market["event"] for market in sport_odds if market.get("live")})
+        group["next_start"] = min(starts) if starts else None
+
+    def kickoff_weight(self, group, now):
+        """How much sooner a group is due because its events are live or about to start"""
+        if group["live"]:
+            return 4.0
+        if group["next_start"] is None:
+            return 1.0
+        hours = (group["next_start"] - now) / 3600
+        if hours <= 2:
+            return 2.0
+        if hours <= 24:
+            return 1.0
+        return 0.5
+
+    def priority(self, name, sport, now=None):
+        """Priority of refreshing a group now, None while it was refreshed too recently"""
+        now = now if now is not None else time.time()
+        group = self.groups.get((name, sport))
+        if group is None or group["refreshed_at"] is None:
+            return float("inf")
+
+        age = now - group["refreshed_at"]
+        if age < self.min_age:
+            return None
+        if age >= self.max_age:
+            # Overdue groups go first, oldest first, so their quotes don't expire
+            return 1e12 + age
+
+        change_rate = group["change_rate"] if group["change_rate"] is not None else CHANGE_RATE_FLOOR
+        return age * (max(change_rate, CHANGE_RATE_FLOOR)) * self.kickoff_weight(group, now)
+
+class RefreshScheduler:
+    """Refreshes every (bookmaker, sport) as an independent asyncio task
+
+    Each one is refreshed on its own interval, or with a page load budget, whenever
+    it is the highest priority one left. Scrapes run on the scraper worker threads,
+    never more at once than the driver pool has browsers. A refresh whose previous
+    scrape is still running is skipped rather than queued behind it. Each scraped
+    sport is handed to on_sport_odds on a single detection thread, so detection and
+    alerts never hold up the event loop and the heartbeat keeps its own schedule
+    however slow the scrapes get. on_round runs on that thread too, once every
+    bookmaker sport has been refreshed since it last ran.
+    """
+
+    def __init__(self, adapters, on_sport_odds, heartbeat=None, heartbeat_interval=HEARTBEAT_INTERVAL * 60,
+                 concurrency=POOL_SIZE, bookmaker_concurrency=BOOKMAKER_CONCURRENCY, budget=SCRAPE_BUDGET,
+                 on_round=None):
+        self.adapters = adapters
+        self.on_sport_odds = on_sport_odds
+        self.on_round = on_round
+        self.heartbeat = heartbeat
+        self.heartbeat_interval = heartbeat_interval
+        self.concurrency = concurrency
+        self.bookmaker_concurrency = bookmaker_concurrency
+        self.budget = budget
+        self.priorities = RefreshPriorities()
+        self.detect_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="detector")
+        # (bookmaker, sport) -> scrape future still owning a worker, and counters
+        self.in_flight = {}
+        self.stats = {}
+        # Refreshes started by the dispatcher, held here so they aren't garbage collected mid-run
+        self.refreshes = set()
+        # Bookmaker sports not yet refreshed in the current round
+        self.round_left = set()
+
+    async def run(self):
+        """Run the refreshes and the heartbeat until cancelled"""
+        self.slots = asyncio.Semaphore(self.concurrency)
+        self.bookmaker_slots = {
+            adapter["name"]: asyncio.Semaphore(self.bookmaker_concurrency) for adapter in self.adapters
+        }
+
+        if self.budget > 0:
+            tasks = [asyncio.create_task(self.dispatch_loop(), name="refresh-dispatcher")]
+        else:
+            tasks = [
+                asyncio.create_task(self.refresh_loop(adapter, sport), name=f"refresh-{adapter['name']}-{sport}")
+                for adapter in self.adapters
+                for sport in adapter["sports"]
+            ]
+        if self.heartbeat is not None:
+            tasks.append(asyncio.create_task(self.heartbeat_loop(), name="heartbeat"))
+
+        logger.info(
+            f"Scheduling {sum(len(adapter['sports']) for adapter in self.adapters)} bookmaker sports "
+            f"with at most {self.concurrency} scrapes at once"
+            + (f" and {self.budget:g} page loads per minute" if self.budget > 0 else "")
+        )
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks + list(self.refreshes):
+                task.cancel()
+
+    async def heartbeat_loop(self):
+        while True:
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logger.error(f"Heartbeat failed: {str(e)}")
+            await asyncio.sleep(self.heartbeat_interval)
+
+    def group_stats(self, name, sport):
+        return self.stats.setdefault((name, sport), {"refreshes": 0, "skipped": 0, "missed_deadline": 0, "errors": 0})
+
+    async def refresh_loop(self, adapter, sport):
+        """Refresh one bookmaker sport forever on its interval"""
+        name = adapter["name"]
+        interval = adapter["intervals"][sport]
+        stats = self.group_stats(name, sport)
+
+        # Spread the first refreshes over the interval instead of hitting every page at once
+        await asyncio.sleep(random.uniform(0, min(interval, 30)))
+
+        while True:
+            started = time.monotonic()
+            previous = self.in_flight.get((name, sport))
+            if previous is not None and not previous.done():
+                stats["skipped"] += 1
+                logger.warning(f"Previous {sport} scrape on {name} is still running, skipping this refresh")
+            else:
+                bookmaker_slots = self.bookmaker_slots[name]
+                await bookmaker_slots.acquire()
+                await self.slots.acquire()
+                await self.refresh(adapter, sport, bookmaker_slots)
+
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    async def dispatch_loop(self):
+        """Spend the page load budget on the highest priority bookmaker sports"""
+        spacing = 60 / self.budget
+        while True:
+            started = time.monotonic()
+            # Pick only once a browser is free, so the choice reflects the latest refreshes
+            await self.slots.acquire()
+            choice = self.next_refresh()
+            if choice is None:
+                self.slots.release()
+            else:
+                adapter, sport = choice
+                bookmaker_slots = self.bookmaker_slots[adapter["name"]]
+                await bookmaker_slots.acquire()
+                task = asyncio.create_task(self.refresh(adapter, sport, bookmaker_slots))
+                self.refreshes.add(task)
+                task.add_done_callback(self.refreshes.discard)
+
+            await asyncio.sleep(max(0.0, spacing - (time.monotonic() - started)))
+
+    def next_refresh(self, now=None):
+        """The due (adapter, sport) with the highest priority whose bookmaker has a free slot, or None"""
+        now = now if now is not None else time.time()
+        best = None
+        best_priority = None
+        for adapter in self.adapters:
+            name = adapter["name"]
+            if self.bookmaker_slots[name].locked():
+                continue
+            for sport in adapter["sports"]:
+                previous = self.in_flight.get((name, sport))
+                if previous is not None and not previous.done():
+                    continue
+                priority = self.priorities.priority(name, sport, now)
+                if priority is not None and (best_priority is None or priority > best_priority):
+                    best, best_priority = (adapter, sport), priority
+        return best
+
+    async def refresh(self, adapter, sport, bookmaker_slots):
+        """Scrape one bookmaker sport on slots already taken and hand its odds to detection"""
+        name = adapter["name"]
+        stats = self.group_stats(name, sport)
+        loop = asyncio.get_running_loop()
+
+        # The slots stay taken until the worker is really done, even after a missed deadline
+        def release(_):
+            self.slots.release()
+            bookmaker_slots.release()
+
+        try:
+            scrape_stats = new_scrape_stats()
+            future = loop.run_in_executor(scrape_executor, scrape_sport_once, adapter, sport, scrape_stats)
+        except Exception:
+            release(None)
+            raise
+        future.add_done_callback(release)
+        self.in_flight[(name, sport)] = future
+
+        deadline = get_scrape_deadline(name)
+        try:
+            sport_odds = await asyncio.wait_for(asyncio.shield(future), timeout=deadline)
+            stats["refreshes"] += 1
+            self.priorities.observe(name, sport, sport_odds)
+            await loop.run_in_executor(self.detect_executor, self.on_sport_odds, name, sport, sport_odds, time.time())
+        except asyncio.TimeoutError:
+            stats["missed_deadline"] += 1
+            logger.warning(f"{sport} scrape on {name} missed its {deadline:.0f}s deadline")
+        except Exception as e:
+            stats["errors"] += 1
+            logger.error(f"Error refreshing {sport} on {name}: {str(e)}", exc_info=True)
+        await self.end_round_after(name, sport)
+
+    async def end_round_after(self, name, sport):
+        """Count a refresh towards the round, running on_round once every bookmaker sport has had one"""
+        if self.on_round is None:
+            return
+        if not self.round_left:
+            self.round_left = {(adapter["name"], group) for adapter in self.adapters for group in adapter["sports"]}
+        self.round_left.discard((name, sport))
+        if self.round_left:
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.detect_executor, self.on_round)
+        except Exception as e:
+            logger.error(f"End of round callback failed: {str(e)}", exc_info=True)
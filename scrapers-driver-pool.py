@@ -0,0 +1,243 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from .extraction import EXTRACTION_MODE
+from .resource_blocking import RESOURCE_STATS, chrome_profile_arguments
+from metrics import DRIVER_INIT_SECONDS
+
+logger = logging.getLogger("arbitrage-bot.driver-pool")
+
+# Pool configuration from environment variables
+POOL_SIZE = int(os.environ.get("DRIVER_POOL_SIZE", 3))
+MAX_PAGE_LOADS = int(os.environ.get("DRIVER_MAX_PAGE_LOADS", 50))
+MAX_RSS_MB = float(os.environ.get("DRIVER_MAX_RSS_MB", 700))
+CHECKOUT_TIMEOUT = float(os.environ.get("DRIVER_CHECKOUT_TIMEOUT", 120))
+
+def initialize_driver(cache_slot=None):
+    """Initialize headless Chrome driver for Selenium"""
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36")
+
+    for argument in chrome_profile_arguments(cache_slot):
+        chrome_options.add_argument(argument)
+
+    if EXTRACTION_MODE == "network" or RESOURCE_STATS:
+        # Expose DevTools network events so odds can be read off the wire and savings counted
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+    try:
+        with DRIVER_INIT_SECONDS.time():
+            driver = webdriver.Chrome(options=chrome_options)
+        return driver
+    except Exception as e:
+        logger.error(f"Failed to initialize Chrome driver: {str(e)}")
+        raise
+
+def process_tree_rss_mb(pid):
+    """Sum the resident memory of a process and all its descendants, in MB"""
+    children = {}
+    try:
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # The command name may contain spaces, so split after its closing paren
+                    fields = f.read().rsplit(")", 1)[1].split()
+                children.setdefault(int(fields[1]), []).append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    except OSError:
+        # No /proc (e.g. macOS), RSS checks are skipped
+        return None
+
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            continue
+
+    return total_kb / 1024
+
+class DriverPool:
+    """Long-lived pool of Chrome drivers shared by all scrapers"""
+
+    def __init__(self, size=POOL_SIZE, max_page_loads=MAX_PAGE_LOADS, max_rss_mb=MAX_RSS_MB, factory=initialize_driver):
+        self.size = size
+        self.max_page_loads = max_page_loads
+        self.max_rss_mb = max_rss_mb
+        self.factory = factory
+        self.idle = queue.LifoQueue()
+        self.page_loads = {}
+        # Slot numbers pick each browser's cache directory, so they're reused after a recycle
+        self.free_slots = list(range(size))
+        self.slots = {}
+        self.lock = threading.Lock()
+        self.created = 0
+        self.closed = False
+
+    def checkout(self, timeout=CHECKOUT_TIMEOUT):
+        """Take a healthy driver from the pool, starting a new one if there is room"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                # Most recently used first, so warm drivers stay warm
+                driver = self.idle.get_nowait()
+            except queue.Empty:
+                with self.lock:
+                    if self.closed:
+                        raise RuntimeError("Driver pool is closed")
+                    can_create = self.created < self.size
+                    if can_create:
+                        self.created += 1
+
+                if can_create:
+                    return self._start_driver()
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No Chrome driver available after {timeout}s")
+
+                # Wake up periodically in case a recycled driver freed a slot
+                try:
+                    driver = self.idle.get(timeout=min(remaining, 1))
+                except queue.Empty:
+                    continue
+
+            if self.is_healthy(driver):
+                return driver
+
+            logger.warning("Discarding unhealthy Chrome driver")
+            self._discard(driver)
+
+    def checkin(self, driver, healthy=True):
+        """Return a driver to the pool, recycling it if it is worn out"""
+        if not healthy or self.closed or self.needs_recycle(driver):
+            self._discard(driver)
+            return
+        self.idle.put(driver)
+
+    @contextmanager
+    def lease(self):
+        """Check a driver out for the duration of a with-block"""
+        driver = self.checkout()
+        healthy = True
+        try:
+            yield driver
+        except Exception:
+            # Don't hand a driver in an unknown state to the next scraper
+            healthy = self.is_healthy(driver)
+            raise
+        finally:
+            self.checkin(driver, healthy=healthy)
+
+    def record_page_load(self, driver, count=1):
+        """Count page loads against the driver's recycle budget"""
+        with self.lock:
+            self.page_loads[id(driver)] = self.page_loads.get(id(driver), 0) + count
+
+    def is_healthy(self, driver):
+        """Check that the browser still answers commands"""
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception as e:
+            logger.warning(f"Chrome driver health check failed: {str(e)}")
+            return False
+
+    def needs_recycle(self, driver):
+        """Check whether a driver has exceeded its page load or memory budget"""
+        page_loads = self.page_loads.get(id(driver), 0)
+        if page_loads >= self.max_page_loads:
+            logger.info(f"Recycling Chrome driver after {page_loads} page loads")
+            return True
+
+        rss_mb = self.driver_rss_mb(driver)
+        if rss_mb is not None and rss_mb > self.max_rss_mb:
+            logger.info(f"Recycling Chrome driver using {rss_mb:.0f}MB RSS")
+            return True
+
+        return False
+
+    def driver_rss_mb(self, driver):
+        """Memory used by the chromedriver process and the browser it launched"""
+        try:
+            pid = driver.service.process.pid
+        except AttributeError:
+            return None
+        return process_tree_rss_mb(pid)
+
+    def close(self):
+        """Quit all idle drivers and stop handing out new ones"""
+        with self.lock:
+            self.closed = True
+        while True:
+            try:
+                driver = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+
+    def _start_driver(self):
+        with self.lock:
+            slot = self.free_slots.pop(0)
+        try:
+            driver = self.factory(slot)
+        except Exception:
+            with self.lock:
+                self.created -= 1
+                self.free_slots.append(slot)
+                self.free_slots.sort()
+            raise
+        with self.lock:
+            self.slots[id(driver)] = slot
+        logger.info(f"Started new Chrome driver for the pool in slot {slot}")
+        return driver
+
+    def _discard(self, driver):
+        with self.lock:
+            self.page_loads.pop(id(driver), None)
+            self.free_slots.append(self.slots.pop(id(driver)))
+            self.free_slots.sort()
+            self.created -= 1
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"Error quitting Chrome driver: {str(e)}")
+
+# Shared pool used by every scraper
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Get the process-wide driver pool, creating it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool()
+            atexit.register(shutdown_pool)
+        return _pool
+
+def shutdown_pool():
+    """Quit all pooled drivers, e.g. at process exit"""
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
@@ -0,0 +1,204 @@
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import TimeoutException
+from .driver_pool import POOL_SIZE, get_pool
+from .extraction import EXTRACTION_MODE, extract_sport_tree, build_sport_odds, clean_text, parse_odds, parse_start_time, is_live
+from .snapshots import SNAPSHOT_MODE, record_snapshot
+from .readiness import PacingPolicy, wait_until_ready
+from .tabs import SCRAPE_TABS, iter_sports_pipelined
+from .network_capture import capture_sport_odds, discard_network_events
+from .resource_blocking import RESOURCE_STATS, apply_blocking_profile, report_page_savings
+from metrics import PAGE_LOAD_SECONDS, READINESS_WAIT_SECONDS, EXTRACTION_SECONDS, MARKETS_SCRAPED, SCRAPE_TIMEOUTS, SCRAPE_ERRORS
+
+logger = logging.getLogger("arbitrage-bot.scraper")
+
+# Extra attempts for a sport page that timed out or failed
+SCRAPE_RETRIES = int(os.environ.get("SCRAPE_RETRIES", 1))
+# Sport pages scraped at once, more than the driver pool just queues for a browser
+SCRAPE_WORKERS = int(os.environ.get("SCRAPE_WORKERS", POOL_SIZE))
+
+# Worker threads for the scrape stage
+scrape_executor = ThreadPoolExecutor(max_workers=SCRAPE_WORKERS, thread_name_prefix="scraper")
+
+def new_scrape_stats():
+    """Counters for one bookmaker scrape"""
+    return {"page_loads": 0, "pages": 0, "markets": 0, "timeouts": 0, "errors": 0, "retries": 0}
+
+def sport_url(adapter, sport):
+    """Build a bookmaker's page URL for one of our sports"""
+    return adapter["url"].format(sport=adapter["sports"][sport])
+
+def iter_sport_odds(adapter, stats=None):
+    """Scrape one bookmaker's sports, yielding (sport, sport_odds) as each page is extracted"""
+    name = adapter["name"]
+    logger.info(f"Starting {name} scraping")
+    sports_to_scrape = list(adapter["sports"])
+    stats = stats if stats is not None else new_scrape_stats()
+
+    pool = get_pool()
+    pacing = PacingPolicy.from_env()
+
+    # Reuse a warm browser from the shared pool instead of starting Chrome each cycle
+    with pool.lease() as driver:
+        # The pooled driver may have just served another bookmaker
+        apply_blocking_profile(driver, adapter["blocked_urls"])
+
+        try:
+            if SCRAPE_TABS > 1:
+                # Load the next sports in other tabs while the current one is extracted
+                yield from iter_sports_pipelined(
+                    driver, sports_to_scrape,
+                    lambda sport: sport_url(adapter, sport),
+                    lambda driver, sport: scrape_sport(driver, adapter, sport, navigate=False, stats=stats),
+                    SCRAPE_TABS, pacing,
+                    prepare_tab=lambda driver: apply_blocking_profile(driver, adapter["blocked_urls"])
+                )
+            else:
+                for sport in sports_to_scrape:
+                    # Random delay between sport scrapes to avoid detection
+                    pacing.wait_turn()
+
+                    logger.info(f"Scraping {sport} from {name}")
+                    yield sport, scrape_sport(driver, adapter, sport, stats=stats)
+        finally:
+            pool.record_page_load(driver, stats["page_loads"])
+
+def scrape_sport_once(adapter, sport, stats=None):
+    """Scrape a single sport from a bookmaker on a pooled browser, for refreshes scheduled per sport"""
+    stats = stats if stats is not None else new_scrape_stats()
+    pool = get_pool()
+
+    with pool.lease() as driver:
+        apply_blocking_profile(driver, adapter["blocked_urls"])
+        try:
+            return scrape_sport(driver, adapter, sport, stats=stats)
+        finally:
+            pool.record_page_load(driver, stats["page_loads"])
+
+def scrape_sport(driver, adapter, sport, navigate=True, stats=None):
+    """Scrape a specific sport from a bookmaker, retrying a failed page"""
+    name = adapter["name"]
+    stats = stats if stats is not None else new_scrape_stats()
+
+    for attempt in range(SCRAPE_RETRIES + 1):
+        if attempt > 0:
+            stats["retries"] += 1
+            logger.info(f"Retrying {sport} on {name} (attempt {attempt + 1})")
+
+        try:
+            # A pipelined scrape has already started loading the page in this tab,
+            # a retry always loads it again
+            sport_odds = load_sport(driver, adapter, sport, navigate=navigate or attempt > 0, stats=stats)
+            stats["pages"] += 1
+            stats["markets"] += len(sport_odds)
+            MARKETS_SCRAPED.inc(name, sport, amount=len(sport_odds))
+            return sport_odds
+
+        except TimeoutException:
+            stats["timeouts"] += 1
+            SCRAPE_TIMEOUTS.inc(name)
+            logger.warning(f"Timeout while loading {sport} on {name}")
+        except Exception as e:
+            stats["errors"] += 1
+            SCRAPE_ERRORS.inc(name)
+            logger.error(f"Error scraping {sport} from {name}: {str(e)}")
+
+    return []
+
+def load_sport(driver, adapter, sport, navigate=True, stats=None):
+    """Load a sport page and extract its odds, raising on failure"""
+    name = adapter["name"]
+
+    if navigate:
+        if EXTRACTION_MODE == "network":
+            # Only decode traffic from the page we are about to load
+            discard_network_events(driver)
+        with PAGE_LOAD_SECONDS.time(name):
+            driver.get(sport_url(adapter, sport))
+    if stats is not None:
+        stats["page_loads"] += 1
+
+    sport_odds = None
+    from_page = False
+    extraction_started = time.perf_counter()
+    if EXTRACTION_MODE == "network":
+        # Read the odds off the wire, falling back to the rendered page if no feed shows up
+        sport_odds = capture_sport_odds(driver, name, sport, adapter["odds_feed"], parse_odds)
+
+    if sport_odds is None:
+        from_page = True
+        # Wait for the odds to load and stop changing
+        with READINESS_WAIT_SECONDS.time(name):
+            wait_until_ready(driver, name, sport, adapter["selectors"])
+
+        extraction_started = time.perf_counter()
+        if EXTRACTION_MODE == "elements":
+            sport_odds = extract_with_elements(driver, adapter, sport)
+        else:
+            # One scripted round trip for the whole page instead of one per element
+            tree = extract_sport_tree(driver, adapter["selectors"])
+            sport_odds = build_sport_odds(tree, name, sport, parse_odds)
+
+    EXTRACTION_SECONDS.observe(time.perf_counter() - extraction_started, name, sport)
+
+    if RESOURCE_STATS:
+        report_page_savings(driver, name, sport)
+
+    # Odds read off the feed can't be replayed from the page, so only rendered pages are recorded
+    if SNAPSHOT_MODE == "record" and from_page:
+        record_snapshot(name, sport, driver.page_source, sport_odds)
+
+    return sport_odds
+
+def extract_with_elements(driver, adapter, sport):
+    """Extract odds by walking the page element by element"""
+    selectors = adapter["selectors"]
+    events = driver.find_elements(By.CSS_SELECTOR, selectors["event"])
+
+    sport_odds = []
+    for event in events:
+        try:
+            event_name = clean_text(event.find_element(By.CSS_SELECTOR, selectors["event_name"]).text)
+            start_nodes = event.find_elements(By.CSS_SELECTOR, selectors["event_start"]) if selectors.get("event_start") else []
+            start = clean_text(start_nodes[0].text) if start_nodes else None
+            starts_at = parse_start_time(start)
+
+            markets = event.find_elements(By.CSS_SELECTOR, selectors["market"])
+            for market in markets:
+                market_name = clean_text(market.find_element(By.CSS_SELECTOR, selectors["market_name"]).text)
+                selections = market.find_elements(By.CSS_SELECTOR, selectors["selection"])
+
+                market_odds = []
+                for selection in selections:
+                    selection_name = clean_text(selection.find_element(By.CSS_SELECTOR, selectors["selection_name"]).text)
+                    odds_value = selection.find_element(By.CSS_SELECTOR, selectors["odds"]).text
+
+                    market_odds.append({
+                        "selection": selection_name,
+                        "odds": parse_odds(odds_value)
+                    })
+
+                record = {
+                    "event": event_name,
+                    "market": market_name,
+                    "bookmaker": adapter["name"],
+                    "odds": market_odds
+                }
+                if starts_at is not None:
+                    record["starts_at"] = starts_at
+                if is_live(start):
+                    record["live"] = True
+                sport_odds.append(record)
+        except Exception as e:
+            logger.warning(f"Error processing an event in {sport} on {adapter['name']}: {str(e)}")
+            continue
+
+    return sport_odds
+
+def get_scrape_deadline(bookmaker):
+    """Get the scrape deadline in seconds for a bookmaker"""
+    default_deadline = float(os.environ.get("SCRAPE_DEADLINE", 90))
+    return float(os.environ.get(f"SCRAPE_DEADLINE_{bookmaker.upper()}", default_deadline))
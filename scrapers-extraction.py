@@ -0,0 +1,146 @@
+import os
+import re
+import time
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger("arbitrage-bot.extraction")
+
+# "bulk" pulls the whole odds tree in one scripted call, "elements" walks it with find_element,
+# "network" decodes the odds feed the page downloads and falls back to "bulk"
+EXTRACTION_MODE = os.environ.get("EXTRACTION_MODE", "bulk")
+
+# Walks event -> market -> selection in the page and returns plain data.
+# Errors are caught per event so one malformed event doesn't lose the page.
+EXTRACT_SCRIPT = """
+var selectors = arguments[0];
+
+// Whitespace is collapsed like clean_text does, so offline replays of a page read the same strings
+function text(node) {
+    return (node.innerText || node.textContent || "").replace(/\\s+/g, " ").trim();
+}
+
+function required(parent, selector) {
+    var node = parent.querySelector(selector);
+    if (!node) {
+        throw new Error("no element matching " + selector);
+    }
+    return text(node);
+}
+
+var tree = [];
+var events = document.querySelectorAll(selectors.event);
+for (var i = 0; i < events.length; i++) {
+    try {
+        var markets = [];
+        var marketNodes = events[i].querySelectorAll(selectors.market);
+        for (var j = 0; j < marketNodes.length; j++) {
+            var selections = [];
+            var selectionNodes = marketNodes[j].querySelectorAll(selectors.selection);
+            for (var k = 0; k < selectionNodes.length; k++) {
+                selections.push({
+                    selection: required(selectionNodes[k], selectors.selection_name),
+                    odds: required(selectionNodes[k], selectors.odds)
+                });
+            }
+            markets.push({
+                market: required(marketNodes[j], selectors.market_name),
+                selections: selections
+            });
+        }
+        var start = selectors.event_start ? events[i].querySelector(selectors.event_start) : null;
+        tree.push({
+            event: required(events[i], selectors.event_name),
+            start: start ? text(start) : null,
+            markets: markets
+        });
+    } catch (e) {
+        tree.push({error: String((e && e.message) || e)});
+    }
+}
+return tree;
+"""
+
+def extract_sport_tree(driver, selectors):
+    """Pull the event/market/selection tree of the current page in one round trip"""
+    return driver.execute_script(EXTRACT_SCRIPT, selectors)
+
+def clean_text(text):
+    """Collapse runs of whitespace to single spaces and trim, as the extraction script does"""
+    return " ".join(text.split())
+
+def build_sport_odds(tree, bookmaker, sport, parse_odds):
+    """Turn an extracted event tree into the market records the finder consumes"""
+    sport_odds = []
+    for event in tree:
+        if "error" in event:
+            logger.warning(f"Error processing an event in {sport} on {bookmaker}: {event['error']}")
+            continue
+
+        starts_at = parse_start_time(event.get("start"))
+        for market in event["markets"]:
+            record = {
+                "event": event["event"],
+                "market": market["market"],
+                "bookmaker": bookmaker,
+                "odds": [
+                    {"selection": selection["selection"], "odds": parse_odds(selection["odds"])}
+                    for selection in market["selections"]
+                ]
+            }
+            if starts_at is not None:
+                record["starts_at"] = starts_at
+            if is_live(event.get("start")):
+                record["live"] = True
+            sport_odds.append(record)
+
+    return sport_odds
+
+def parse_odds(odds_string):
+    """Parse odds from string to float"""
+    try:
+        # Remove any whitespace and convert to float
+        return float(odds_string.strip())
+    except ValueError:
+        logger.warning(f"Could not parse odds value: {odds_string}")
+        return 0.0
+
+def is_live(start):
+    """Whether an event start says the event is already in play"""
+    return start is not None and str(start).strip().lower() in ("live", "in play", "in-play", "inplay")
+
+CLOCK_TIME = re.compile(r"(?:(today|tomorrow)\s+)?(\d{1,2}):(\d{2})$", re.IGNORECASE)
+
+def parse_start_time(start, now=None):
+    """Parse an event start (epoch, ISO 8601, "19:30" or "Tomorrow 19:30") to epoch seconds, None if unknown"""
+    if start is None:
+        return None
+    now = now if now is not None else time.time()
+    text = str(start).strip()
+
+    if is_live(text):
+        return None
+    try:
+        value = float(text)
+        # Feeds send epoch seconds or milliseconds
+        return value / 1000 if value > 1e11 else value
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        pass
+
+    match = CLOCK_TIME.match(text)
+    if match:
+        day, hour, minute = match.groups()
+        today = datetime.fromtimestamp(now)
+        start_at = today.replace(hour=int(hour) % 24, minute=int(minute), second=0, microsecond=0)
+        if (day or "").lower() == "tomorrow":
+            start_at += timedelta(days=1)
+        elif day is None and start_at.timestamp() < now - 3 * 3600:
+            # A bare clock time well in the past is tomorrow's
+            start_at += timedelta(days=1)
+        return start_at.timestamp()
+
+    return None
@@ -1,4 +1,3 @@
 # This file makes the scrapers directory a Python package
-from . import bet365_scraper
-from . import betmgm_scraper
-from . import stake_scraper
+from . import registry
+from . import engine
@@ -0,0 +1,217 @@
+import os
+import json
+import time
+import base64
+import logging
+import weakref
+from .extraction import build_sport_odds
+
+logger = logging.getLogger("arbitrage-bot.network-capture")
+
+# How long to wait for an odds feed before falling back to the rendered page, in seconds
+CAPTURE_TIMEOUT = float(os.environ.get("CAPTURE_TIMEOUT", 8))
+# How long the feed must stay quiet after the first payload before we decode, in seconds
+CAPTURE_QUIET_PERIOD = float(os.environ.get("CAPTURE_QUIET_PERIOD", 0.3))
+
+# Chrome performance log events not yet consumed, per driver and per tab
+_pending_events = weakref.WeakKeyDictionary()
+# Request and byte counters for the page in each tab, per driver
+_page_traffic = weakref.WeakKeyDictionary()
+
+class PageTraffic:
+    """Requests and bytes a page load downloaded, pulled from cache or had blocked"""
+
+    def __init__(self):
+        self.requests = 0
+        self.blocked = 0
+        self.cached = 0
+        self.downloaded_bytes = 0
+        self.cached_bytes = 0
+        self.blocked_by_type = {}
+        self.request_types = {}
+        self.cached_requests = set()
+        self.expected_sizes = {}
+        self.received_sizes = {}
+
+    def add(self, events):
+        """Fold a batch of DevTools network events into the counters"""
+        for event in events:
+            method = event.get("method")
+            params = event.get("params", {})
+            request_id = params.get("requestId")
+
+            if method == "Network.requestWillBeSent":
+                self.requests += 1
+                self.request_types[request_id] = params.get("type", "Other")
+
+            elif method == "Network.requestServedFromCache":
+                self.cached_requests.add(request_id)
+
+            elif method == "Network.responseReceived":
+                response = params.get("response", {})
+                if response.get("fromDiskCache") or response.get("fromPrefetchCache"):
+                    self.cached_requests.add(request_id)
+                for name, value in response.get("headers", {}).items():
+                    if name.lower() == "content-length" and str(value).isdigit():
+                        self.expected_sizes[request_id] = int(value)
+
+            elif method == "Network.dataReceived":
+                self.received_sizes[request_id] = self.received_sizes.get(request_id, 0) + params.get("dataLength", 0)
+
+            elif method == "Network.loadingFinished":
+                if request_id in self.cached_requests:
+                    self.cached += 1
+                    self.cached_bytes += self.expected_sizes.get(request_id) or self.received_sizes.get(request_id, 0)
+                else:
+                    self.downloaded_bytes += int(params.get("encodedDataLength", 0))
+
+            elif method == "Network.loadingFailed":
+                if params.get("blockedReason") or "ERR_BLOCKED_BY_CLIENT" in params.get("errorText", ""):
+                    resource_type = params.get("type") or self.request_types.get(request_id, "Other")
+                    self.blocked += 1
+                    self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+
+def drain_performance_log(driver):
+    """Move new DevTools events from the driver's performance log into per-tab buffers"""
+    buffers = _pending_events.setdefault(driver, {})
+    for entry in driver.get_log("performance"):
+        try:
+            message = json.loads(entry["message"])
+        except (KeyError, ValueError):
+            continue
+        buffers.setdefault(message.get("webview"), []).append(message["message"])
+    return buffers
+
+def take_network_events(driver):
+    """Return and forget the DevTools events recorded for the current tab"""
+    buffers = drain_performance_log(driver)
+    handle = driver.current_window_handle
+    if handle in buffers:
+        events = buffers.pop(handle)
+    elif not buffers or set(buffers) & set(driver.window_handles):
+        # Other tabs have traffic, this one has none yet
+        events = []
+    else:
+        # Window handles are normally the tab's DevTools target id, if not we can't split by tab
+        events = []
+        for key in list(buffers):
+            events.extend(buffers.pop(key))
+
+    _page_traffic.setdefault(driver, {}).setdefault(handle, PageTraffic()).add(events)
+    return events
+
+def pop_page_traffic(driver):
+    """Return the traffic counters for the current tab's page and start new ones"""
+    take_network_events(driver)
+    return _page_traffic[driver].pop(driver.current_window_handle)
+
+def discard_network_events(driver):
+    """Forget the current tab's traffic so far, e.g. before navigating it to a new page"""
+    take_network_events(driver)
+
+def read_response_body(driver, request_id):
+    """Fetch a finished response's body through the DevTools protocol"""
+    response = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+    body = response.get("body", "")
+    if response.get("base64Encoded"):
+        body = base64.b64decode(body).decode("utf-8", errors="replace")
+    return body
+
+def collect_feed_payloads(driver, events, feed, requests):
+    """Decode the JSON odds payloads among a batch of network events
+
+    `requests` carries request ids matching the feed across batches, since a response
+    usually arrives in one batch and finishes loading in a later one.
+    """
+    payloads = []
+    for event in events:
+        method = event.get("method")
+        params = event.get("params", {})
+
+        if method == "Network.responseReceived":
+            if feed["url_contains"] in params.get("response", {}).get("url", ""):
+                requests.add(params["requestId"])
+
+        elif method == "Network.loadingFinished" and params.get("requestId") in requests:
+            requests.discard(params["requestId"])
+            try:
+                payloads.append(json.loads(read_response_body(driver, params["requestId"])))
+            except Exception as e:
+                logger.debug(f"Skipping unreadable odds response: {str(e)}")
+
+        elif method == "Network.loadingFailed":
+            requests.discard(params.get("requestId"))
+
+        elif method == "Network.webSocketFrameReceived":
+            try:
+                payload = json.loads(params["response"]["payloadData"])
+            except (KeyError, ValueError):
+                continue
+            # Sockets also carry heartbeats and other chatter, keep only frames with odds
+            if next(find_events(payload, feed), None) is not None:
+                payloads.append(payload)
+
+    return payloads
+
+def find_events(payload, feed):
+    """Walk a decoded payload and yield every object shaped like an event"""
+    pending = [payload]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, dict):
+            if feed["event_name"] in node and isinstance(node.get(feed["markets"]), list):
+                yield node
+                continue
+            pending.extend(node.values())
+        elif isinstance(node, list):
+            pending.extend(reversed(node))
+
+def decode_feed_events(payloads, feed):
+    """Turn odds feed payloads into the same tree the DOM extraction returns"""
+    tree = []
+    for payload in payloads:
+        for event in find_events(payload, feed):
+            try:
+                markets = []
+                for market in event[feed["markets"]]:
+                    selections = [
+                        {"selection": str(selection[feed["selection_name"]]), "odds": str(selection[feed["odds"]])}
+                        for selection in market[feed["selections"]]
+                    ]
+                    markets.append({"market": str(market[feed["market_name"]]), "selections": selections})
+                start = event.get(feed.get("event_start"))
+                tree.append({
+                    "event": str(event[feed["event_name"]]),
+                    "start": str(start) if start is not None else None,
+                    "markets": markets
+                })
+            except (KeyError, TypeError) as e:
+                tree.append({"error": f"unexpected feed shape, missing {str(e)}"})
+    return tree
+
+def capture_sport_odds(driver, bookmaker, sport, feed, parse_odds, timeout=CAPTURE_TIMEOUT):
+    """Build market records straight from the odds feed of the page loading in the current tab
+
+    Returns None when no odds payload arrived in time, so the caller can fall back
+    to the rendered page.
+    """
+    deadline = time.monotonic() + timeout
+    requests = set()
+    payloads = []
+    last_payload = None
+
+    while time.monotonic() < deadline:
+        new_payloads = collect_feed_payloads(driver, take_network_events(driver), feed, requests)
+        if new_payloads:
+            payloads.extend(new_payloads)
+            last_payload = time.monotonic()
+        elif last_payload is not None and not requests and time.monotonic() - last_payload >= CAPTURE_QUIET_PERIOD:
+            break
+        time.sleep(0.05)
+
+    tree = decode_feed_events(payloads, feed)
+    if not tree:
+        logger.info(f"No odds feed captured for {sport} on {bookmaker}")
+        return None
+
+    return build_sport_odds(tree, bookmaker, sport, parse_odds)
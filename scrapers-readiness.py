@@ -0,0 +1,157 @@
+import os
+import time
+import random
+import logging
+import threading
+from collections import deque
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+logger = logging.getLogger("arbitrage-bot.readiness")
+
+# Bounds for the self-tuning waits, in seconds
+MAX_LOAD_TIMEOUT = float(os.environ.get("READY_MAX_LOAD_TIMEOUT", 10))
+MIN_LOAD_TIMEOUT = float(os.environ.get("READY_MIN_LOAD_TIMEOUT", 3))
+MAX_SETTLE_TIME = float(os.environ.get("READY_MAX_SETTLE_TIME", 4))
+MIN_SETTLE_TIME = float(os.environ.get("READY_MIN_SETTLE_TIME", 0.5))
+# How long the odds DOM must stay unchanged before we call it settled, in milliseconds
+QUIET_PERIOD_MS = int(os.environ.get("READY_QUIET_PERIOD_MS", 300))
+HISTORY_SIZE = int(os.environ.get("READY_HISTORY_SIZE", 20))
+
+# Resolves once the page has stopped mutating, the usual number of selections
+# is present, or the cap runs out, whichever comes first
+SETTLE_SCRIPT = """
+var selectionSelector = arguments[0];
+var expected = arguments[1];
+var quietMs = arguments[2];
+var capMs = arguments[3];
+var done = arguments[arguments.length - 1];
+
+var start = Date.now();
+var lastMutation = start;
+var observer = new MutationObserver(function() { lastMutation = Date.now(); });
+observer.observe(document.body, {childList: true, subtree: true, characterData: true});
+
+function check() {
+    var count = document.querySelectorAll(selectionSelector).length;
+    var now = Date.now();
+    var reason = null;
+    if (expected > 0 && count >= expected) {
+        reason = "count";
+    } else if (now - lastMutation >= quietMs) {
+        reason = "quiet";
+    } else if (now - start >= capMs) {
+        reason = "cap";
+    }
+    if (reason) {
+        observer.disconnect();
+        done({reason: reason, count: count, elapsed: (now - start) / 1000});
+    } else {
+        setTimeout(check, 50);
+    }
+}
+check();
+"""
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty sequence"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class ReadinessStats:
+    """Rolling load and settle latencies per bookmaker and sport"""
+
+    def __init__(self, history_size=HISTORY_SIZE):
+        self.history_size = history_size
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def record(self, bookmaker, sport, load_time, settle_time, selection_count):
+        with self.lock:
+            history = self.samples.setdefault((bookmaker, sport), deque(maxlen=self.history_size))
+            history.append((load_time, settle_time, selection_count))
+
+    def history(self, bookmaker, sport):
+        with self.lock:
+            return list(self.samples.get((bookmaker, sport), ()))
+
+    def load_timeout(self, bookmaker, sport):
+        """How long to wait for the odds container to appear"""
+        history = self.history(bookmaker, sport)
+        if not history:
+            return MAX_LOAD_TIMEOUT
+        p95 = percentile([sample[0] for sample in history], 0.95)
+        return min(MAX_LOAD_TIMEOUT, max(MIN_LOAD_TIMEOUT, p95 * 2 + 1))
+
+    def settle_cap(self, bookmaker, sport):
+        """Longest we let the odds keep rendering after the container appears"""
+        history = self.history(bookmaker, sport)
+        if not history:
+            return MAX_SETTLE_TIME
+        p95 = percentile([sample[1] for sample in history], 0.95)
+        return min(MAX_SETTLE_TIME, max(MIN_SETTLE_TIME, p95 * 1.5 + 0.25))
+
+    def expected_selections(self, bookmaker, sport):
+        """Selection count that usually means the page is fully rendered, 0 if unknown"""
+        counts = [sample[2] for sample in self.history(bookmaker, sport) if sample[2] > 0]
+        if not counts:
+            return 0
+        # A little under the median so a market or two coming off the board doesn't cost us the cap
+        return int(percentile(counts, 0.5) * 0.9)
+
+readiness_stats = ReadinessStats()
+
+def wait_until_ready(driver, bookmaker, sport, selectors, stats=readiness_stats):
+    """Wait for the odds to appear and stop changing, tuned by past loads of this page"""
+    start = time.monotonic()
+    WebDriverWait(driver, stats.load_timeout(bookmaker, sport)).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, selectors["ready"]))
+    )
+    load_time = time.monotonic() - start
+
+    result = driver.execute_async_script(
+        SETTLE_SCRIPT,
+        selectors["selection"],
+        stats.expected_selections(bookmaker, sport),
+        QUIET_PERIOD_MS,
+        int(stats.settle_cap(bookmaker, sport) * 1000)
+    )
+
+    stats.record(bookmaker, sport, load_time, result["elapsed"], result["count"])
+    logger.debug(
+        f"{bookmaker} {sport} ready after {load_time:.2f}s load + {result['elapsed']:.2f}s settle "
+        f"({result['reason']}, {result['count']} selections)"
+    )
+    return result
+
+class PacingPolicy:
+    """Random delay between page loads on one bookmaker, to avoid detection
+
+    "block" sleeps the full delay after each page, "overlap" counts the time spent
+    waiting and extracting towards the delay, and "off" disables pacing.
+    """
+
+    def __init__(self, mode="overlap", min_delay=1, max_delay=3):
+        self.mode = mode
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.last_load = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            mode=os.environ.get("SCRAPE_PACING", "overlap"),
+            min_delay=float(os.environ.get("SCRAPE_DELAY_MIN", 1)),
+            max_delay=float(os.environ.get("SCRAPE_DELAY_MAX", 3))
+        )
+
+    def wait_turn(self):
+        """Block until the next page load is allowed"""
+        if self.mode != "off" and self.last_load is not None:
+            delay = random.uniform(self.min_delay, self.max_delay)
+            if self.mode == "overlap":
+                delay -= time.monotonic() - self.last_load
+            if delay > 0:
+                time.sleep(delay)
+        self.last_load = time.monotonic()
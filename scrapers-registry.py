@@ -0,0 +1,171 @@
+import os
+import json
+import logging
+from .resource_blocking import DEFAULT_BLOCKED_URLS
+
+logger = logging.getLogger("arbitrage-bot.registry")
+
+# Optional JSON file with extra bookmakers or overrides for the built-in ones,
+# and an optional comma separated list of bookmakers to scrape
+BOOKMAKER_CONFIG = os.environ.get("BOOKMAKER_CONFIG", "")
+ENABLED_BOOKMAKERS = os.environ.get("ENABLED_BOOKMAKERS", "")
+# Default refresh interval of every bookmaker sport, in minutes
+SCRAPE_INTERVAL = float(os.environ.get("SCRAPE_INTERVAL", 2))
+
+# Selectors most bookmaker pages share, adapters only list what differs
+DEFAULT_SELECTORS = {
+    "event_start": ".event-time",
+    "market_name": ".market-name",
+    "selection": ".selection",
+    "selection_name": ".selection-name",
+    "odds": ".odds"
+}
+
+# Odds feed field names most bookmaker APIs share for network capture mode
+DEFAULT_ODDS_FEED = {
+    "event_name": "name",
+    "event_start": "startTime",
+    "markets": "markets",
+    "market_name": "name",
+    "selections": "selections",
+    "selection_name": "name",
+    "odds": "odds"
+}
+
+# Built-in bookmaker adapters. "sports" maps our sport names to the bookmaker's
+# URL slug, so the same sport lines up across bookmakers in the finder. An
+# optional "interval" (seconds) sets how often the bookmaker's sports are
+# refreshed and "sport_intervals" overrides it per sport.
+# These are sample URLs, selectors and feeds - you'll need to adjust for the actual sites.
+BOOKMAKERS = [
+    {
+        "name": "Bet365",
+        "url": "https://www.bet365.com/en/sports/{sport}/#/canada/",
+        "sports": {
+            "soccer": "soccer",
+            "hockey": "hockey",
+            "basketball": "basketball",
+            "baseball": "baseball",
+            "tennis": "tennis",
+            "american-football": "american-football",
+            "boxing": "boxing"
+        },
+        "selectors": {
+            "ready": ".event-container",
+            "event": ".event-container",
+            "event_name": ".event-name",
+            "market": ".market"
+        },
+        "odds_feed": {"url_contains": "/SportsBook.API/"},
+        "blocked_urls": ["*bet365.com/*/streaming/*"]
+    },
+    {
+        "name": "BetMGM",
+        "url": "https://sports.on.betmgm.ca/en/sports/{sport}",
+        "sports": {
+            "soccer": "soccer",
+            "hockey": "hockey",
+            "basketball": "basketball",
+            "baseball": "baseball",
+            "tennis": "tennis",
+            "american-football": "football",
+            "boxing": "boxing"
+        },
+        "selectors": {
+            "ready": ".event-list",
+            "event": ".event-item",
+            "event_name": ".event-description",
+            "market": ".market-container"
+        },
+        "odds_feed": {"url_contains": "/cds-api/"},
+        "blocked_urls": ["*betmgm.ca/*/promotions/*"]
+    },
+    {
+        "name": "Stake",
+        "url": "https://stake.com/sports/{sport}/canada",
+        "sports": {
+            "soccer": "soccer",
+            "hockey": "ice-hockey",
+            "basketball": "basketball",
+            "baseball": "baseball",
+            "tennis": "tennis",
+            "american-football": "american-football",
+            "boxing": "boxing"
+        },
+        "selectors": {
+            "ready": ".events-list",
+            "event": ".event-row",
+            "event_name": ".event-name",
+            "market": ".market-group"
+        },
+        "odds_feed": {"url_contains": "/_api/graphql"},
+        "blocked_urls": ["*stake.com/*/casino/*"]
+    }
+]
+
+REQUIRED_FIELDS = ["name", "url", "sports", "selectors"]
+REQUIRED_SELECTORS = ["ready", "event", "event_name", "market"]
+
+def build_adapter(definition):
+    """Fill in defaults for a bookmaker definition and check it is complete"""
+    missing = [field for field in REQUIRED_FIELDS if field not in definition]
+    missing += [f"selectors.{key}" for key in REQUIRED_SELECTORS if key not in definition.get("selectors", {})]
+    if missing:
+        raise ValueError(f"Bookmaker {definition.get('name', '?')} is missing {', '.join(missing)}")
+
+    sports = definition["sports"]
+    if isinstance(sports, list):
+        # A plain list means the slugs are our sport names
+        sports = {sport: sport for sport in sports}
+
+    interval = float(definition.get("interval", SCRAPE_INTERVAL * 60))
+    sport_intervals = definition.get("sport_intervals", {})
+
+    return {
+        "name": definition["name"],
+        "url": definition["url"],
+        "sports": dict(sports),
+        "intervals": {sport: float(sport_intervals.get(sport, interval)) for sport in sports},
+        "selectors": {**DEFAULT_SELECTORS, **definition["selectors"]},
+        "odds_feed": {**DEFAULT_ODDS_FEED, "url_contains": "/api/", **definition.get("odds_feed", {})},
+        "blocked_urls": DEFAULT_BLOCKED_URLS + definition.get("blocked_urls", []),
+        "enabled": definition.get("enabled", True)
+    }
+
+def load_definitions(config_path=BOOKMAKER_CONFIG):
+    """Built-in definitions merged with the ones from the config file, by name"""
+    definitions = {definition["name"]: dict(definition) for definition in BOOKMAKERS}
+
+    if config_path:
+        with open(config_path) as f:
+            for definition in json.load(f):
+                name = definition["name"]
+                if name in definitions:
+                    # Partial overrides keep the built-in selectors they don't mention
+                    selectors = {**definitions[name].get("selectors", {}), **definition.get("selectors", {})}
+                    definitions[name] = {**definitions[name], **definition, "selectors": selectors}
+                else:
+                    definitions[name] = definition
+        logger.info(f"Loaded bookmaker config from {config_path}")
+
+    return list(definitions.values())
+
+def get_adapters(config_path=BOOKMAKER_CONFIG, enabled=ENABLED_BOOKMAKERS):
+    """All enabled bookmaker adapters, in registry order"""
+    names = [name.strip() for name in enabled.split(",") if name.strip()]
+    adapters = []
+    for definition in load_definitions(config_path):
+        adapter = build_adapter(definition)
+        if not adapter["enabled"]:
+            continue
+        if names and adapter["name"] not in names:
+            continue
+        adapters.append(adapter)
+    return adapters
+
+def get_adapter(name, config_path=BOOKMAKER_CONFIG):
+    """Look up one bookmaker adapter by name, enabled or not"""
+    for definition in load_definitions(config_path):
+        if definition["name"] == name:
+            return build_adapter(definition)
+    raise KeyError(f"Unknown bookmaker: {name}")
@@ -0,0 +1,89 @@
+import os
+import logging
+from .network_capture import pop_page_traffic
+
+logger = logging.getLogger("arbitrage-bot.resource-blocking")
+
+# Block requests the scrapers never read, report savings per page, and optionally
+# keep Chrome's disk cache between runs
+BLOCK_RESOURCES = os.environ.get("BLOCK_RESOURCES", "1") == "1"
+RESOURCE_STATS = os.environ.get("RESOURCE_STATS", "1") == "1"
+CHROME_CACHE_DIR = os.environ.get("CHROME_CACHE_DIR", "")
+CHROME_CACHE_SIZE_MB = int(os.environ.get("CHROME_CACHE_SIZE_MB", 200))
+
+# URL patterns no odds page needs: media, fonts, analytics, ads and chat widgets
+DEFAULT_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*.mp4", "*.webm", "*.mp3",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*facebook.net*", "*facebook.com/tr*",
+    "*hotjar.com*", "*segment.io*", "*newrelic.com*", "*nr-data.net*",
+    "*optimizely.com*", "*clarity.ms*", "*intercom.io*", "*zendesk.com*",
+    "*livechatinc.com*"
+]
+
+# Typical transfer size of a blocked request by resource type, used to estimate bytes saved
+TYPICAL_SIZES = {
+    "Image": 30 * 1024,
+    "Font": 40 * 1024,
+    "Media": 250 * 1024,
+    "Script": 50 * 1024,
+    "Stylesheet": 20 * 1024,
+    "XHR": 2 * 1024,
+    "Fetch": 2 * 1024,
+    "Ping": 512,
+    "Other": 4 * 1024
+}
+
+def chrome_profile_arguments(cache_slot=None):
+    """Extra Chrome flags for a lean scraping profile"""
+    arguments = [
+        "--disable-extensions",
+        "--disable-background-networking",
+        "--disable-sync",
+        "--disable-default-apps",
+        "--mute-audio",
+        "--no-first-run"
+    ]
+
+    if BLOCK_RESOURCES:
+        arguments.append("--blink-settings=imagesEnabled=false")
+
+    if CHROME_CACHE_DIR and cache_slot is not None:
+        # Each pooled browser gets its own cache directory, Chrome doesn't share one safely
+        cache_dir = os.path.join(CHROME_CACHE_DIR, f"slot-{cache_slot}")
+        os.makedirs(cache_dir, exist_ok=True)
+        arguments.append(f"--disk-cache-dir={cache_dir}")
+        arguments.append(f"--disk-cache-size={CHROME_CACHE_SIZE_MB * 1024 * 1024}")
+
+    return arguments
+
+def apply_blocking_profile(driver, blocked_urls):
+    """Block a bookmaker's unneeded URL patterns in the current tab"""
+    if not BLOCK_RESOURCES:
+        return
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_urls})
+
+def report_page_savings(driver, bookmaker, sport):
+    """Log what the page in the current tab downloaded and what blocking and caching saved"""
+    traffic = pop_page_traffic(driver)
+    blocked_bytes = sum(
+        TYPICAL_SIZES.get(resource_type, TYPICAL_SIZES["Other"]) * count
+        for resource_type, count in traffic.blocked_by_type.items()
+    )
+
+    logger.info(
+        f"{bookmaker} {sport}: {traffic.requests} requests, {traffic.blocked} blocked, "
+        f"{traffic.cached} from cache, {traffic.downloaded_bytes / 1024:.0f}KB downloaded, "
+        f"{traffic.cached_bytes / 1024:.0f}KB served from cache, ~{blocked_bytes / 1024:.0f}KB not fetched"
+    )
+    return {
+        "requests": traffic.requests,
+        "blocked": traffic.blocked,
+        "cached": traffic.cached,
+        "downloaded_bytes": traffic.downloaded_bytes,
+        "cached_bytes": traffic.cached_bytes,
+        "blocked_bytes_estimate": blocked_bytes
+    }
@@ -0,0 +1,159 @@
+import os
+import gzip
+import json
+import time
+import logging
+import argparse
+from datetime import datetime, timezone
+from bs4 import BeautifulSoup
+from .extraction import build_sport_odds, parse_odds, clean_text
+from .registry import get_adapter, get_adapters
+
+logger = logging.getLogger("arbitrage-bot.snapshots")
+
+# "record" saves every scraped page to SNAPSHOT_DIR
+SNAPSHOT_MODE = os.environ.get("SNAPSHOT_MODE", "")
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "snapshots")
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+def record_snapshot(bookmaker, sport, html, sport_odds, snapshot_dir=None):
+    """Save a rendered page and the odds parsed from it"""
+    captured_at = datetime.now(timezone.utc)
+    directory = os.path.join(snapshot_dir or SNAPSHOT_DIR, bookmaker, sport)
+    path = os.path.join(directory, captured_at.strftime("%Y%m%dT%H%M%S%fZ") + ".json.gz")
+
+    snapshot = {
+        "bookmaker": bookmaker,
+        "sport": sport,
+        "captured_at": captured_at.isoformat(),
+        "html": html,
+        "odds": sport_odds
+    }
+
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        logger.debug(f"Recorded {bookmaker} {sport} snapshot to {path}")
+        return path
+    except Exception as e:
+        # Recording is best effort, it must never cost us the scrape
+        logger.warning(f"Could not record {bookmaker} {sport} snapshot: {str(e)}")
+        return None
+
+def load_snapshot(path):
+    """Load a snapshot written by record_snapshot"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+def find_snapshots(snapshot_dir=None, bookmaker=None, sport=None):
+    """List snapshot paths, oldest first, optionally filtered by bookmaker and sport"""
+    root = snapshot_dir or SNAPSHOT_DIR
+    paths = []
+    for dirpath, _, filenames in os.walk(root):
+        parts = os.path.relpath(dirpath, root).split(os.sep)
+        if len(parts) != 2:
+            continue
+        if bookmaker and parts[0] != bookmaker:
+            continue
+        if sport and parts[1] != sport:
+            continue
+        paths.extend(os.path.join(dirpath, name) for name in filenames if name.endswith(".json.gz"))
+
+    # File names are timestamps, so sorting by name is sorting by capture time
+    return sorted(paths, key=os.path.basename)
+
+def extract_tree_from_html(html, selectors):
+    """Offline equivalent of the in-browser extraction script"""
+    soup = BeautifulSoup(html, HTML_PARSER)
+
+    def required(parent, selector):
+        node = parent.select_one(selector)
+        if node is None:
+            raise ValueError(f"no element matching {selector}")
+        return clean_text(node.get_text(" "))
+
+    tree = []
+    for event in soup.select(selectors["event"]):
+        try:
+            markets = []
+            for market in event.select(selectors["market"]):
+                selections = [
+                    {
+                        "selection": required(selection, selectors["selection_name"]),
+                        "odds": required(selection, selectors["odds"])
+                    }
+                    for selection in market.select(selectors["selection"])
+                ]
+                markets.append({"market": required(market, selectors["market_name"]), "selections": selections})
+            start = event.select_one(selectors["event_start"]) if selectors.get("event_start") else None
+            tree.append({
+                "event": required(event, selectors["event_name"]),
+                "start": clean_text(start.get_text(" ")) if start is not None else None,
+                "markets": markets
+            })
+        except ValueError as e:
+            tree.append({"error": str(e)})
+
+    return tree
+
+def replay_snapshot(snapshot, adapter=None):
+    """Re-run a bookmaker's current extraction logic against a recorded page"""
+    adapter = adapter or get_adapter(snapshot["bookmaker"])
+    tree = extract_tree_from_html(snapshot["html"], adapter["selectors"])
+    return build_sport_odds(tree, snapshot["bookmaker"], snapshot["sport"], parse_odds)
+
+def benchmark_replay(snapshot_dir=None, bookmaker=None, sport=None, repeat=1):
+    """Measure offline parse throughput over recorded snapshots"""
+    snapshots = [load_snapshot(path) for path in find_snapshots(snapshot_dir, bookmaker, sport)]
+    if not snapshots:
+        logger.warning("No snapshots found to replay")
+        return None
+
+    pages = 0
+    markets = 0
+    mismatches = 0
+    html_bytes = 0
+    adapters = {adapter["name"]: adapter for adapter in get_adapters(enabled="")}
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for snapshot in snapshots:
+            sport_odds = replay_snapshot(snapshot, adapters.get(snapshot["bookmaker"]))
+            pages += 1
+            markets += len(sport_odds)
+            html_bytes += len(snapshot["html"])
+            if sport_odds != snapshot["odds"]:
+                mismatches += 1
+    elapsed = time.perf_counter() - start
+
+    return {
+        "pages": pages,
+        "markets": markets,
+        "mismatches": mismatches,
+        "seconds": elapsed,
+        "pages_per_second": pages / elapsed if elapsed else 0.0,
+        "markets_per_second": markets / elapsed if elapsed else 0.0,
+        "mb_per_second": html_bytes / elapsed / 1e6 if elapsed else 0.0
+    }
+
+# Replay recorded snapshots offline, e.g. python -m scrapers.snapshots --repeat 5
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Replay recorded scraper snapshots")
+    parser.add_argument("--dir", default=SNAPSHOT_DIR)
+    parser.add_argument("--bookmaker", choices=[adapter["name"] for adapter in get_adapters(enabled="")])
+    parser.add_argument("--sport")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    stats = benchmark_replay(args.dir, args.bookmaker, args.sport, args.repeat)
+    if stats:
+        print(f"Parsed {stats['pages']} pages, {stats['markets']} markets in {stats['seconds']:.2f}s")
+        print(f"{stats['pages_per_second']:.1f} pages/s, {stats['markets_per_second']:.0f} markets/s, {stats['mb_per_second']:.1f} MB/s of HTML")
+        print(f"{stats['mismatches']} pages parsed differently than when recorded")
@@ -0,0 +1,94 @@
+import os
+import logging
+from collections import deque
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+
+logger = logging.getLogger("arbitrage-bot.tabs")
+
+# Number of tabs each scraper keeps loading in parallel, 1 disables pipelining
+SCRAPE_TABS = int(os.environ.get("SCRAPE_TABS", 1))
+
+# Seconds a tab's previous page may linger after its next sport was requested
+NAVIGATION_TIMEOUT = float(os.environ.get("NAVIGATION_TIMEOUT", 15))
+
+def start_load(driver, url):
+    """Start navigating the current tab without waiting for the page to load, returning the old page's root"""
+    old_root = driver.find_element(By.TAG_NAME, "html")
+    driver.execute_script("window.location.href = arguments[0];", url)
+    return old_root
+
+def wait_for_navigation(driver, old_root, url, timeout=NAVIGATION_TIMEOUT):
+    """Wait for the tab to leave the page it showed when its load was started.
+
+    Until then the readiness wait could match the previous sport's odds, so a load
+    that never commits is done again in the foreground.
+    """
+    try:
+        WebDriverWait(driver, timeout).until(EC.staleness_of(old_root))
+    except TimeoutException:
+        logger.warning(f"Tab still on its previous page after {timeout:.0f}s, loading {url} again")
+        try:
+            driver.get(url)
+        except Exception as e:
+            # The scrape's own retries load the page again if this left it unusable
+            logger.warning(f"Could not reload {url}: {str(e)}")
+
+def iter_sports_pipelined(driver, sports, sport_url, scrape_loaded, tabs=SCRAPE_TABS, pacing=None, prepare_tab=None):
+    """Scrape sports across several tabs of one browser, yielding (sport, result) as each is extracted.
+
+    Every tab is given a sport to load up front. Tabs are then visited in the order
+    their loads were started; once a tab's sport is extracted, it starts loading the
+    next pending sport, so network and rendering overlap with extraction.
+    """
+    pending = deque(sports)
+    handles = [driver.current_window_handle]
+    loading = {}
+
+    def start_next(handle):
+        if not pending:
+            return
+        sport = pending.popleft()
+        driver.switch_to.window(handle)
+        if pacing is not None:
+            pacing.wait_turn()
+        loading[handle] = sport, start_load(driver, sport_url(sport))
+
+    try:
+        while len(handles) < min(tabs, len(sports)):
+            driver.switch_to.new_window("tab")
+            handles.append(driver.current_window_handle)
+            # Per-tab DevTools settings such as blocked URLs don't carry over to new tabs
+            if prepare_tab is not None:
+                prepare_tab(driver)
+
+        for handle in handles:
+            start_next(handle)
+
+        order = deque(handles)
+        while loading:
+            handle = order.popleft()
+            if handle not in loading:
+                continue
+            sport, old_root = loading.pop(handle)
+
+            driver.switch_to.window(handle)
+            wait_for_navigation(driver, old_root, sport_url(sport))
+            logger.debug(f"Extracting {sport} from tab {handles.index(handle) + 1} of {len(handles)}")
+            result = scrape_loaded(driver, sport)
+
+            # Keep the next page loading while the caller handles this one
+            start_next(handle)
+            order.append(handle)
+            yield sport, result
+    finally:
+        # Leave the driver with a single tab for the next lease
+        for handle in handles[1:]:
+            try:
+                driver.switch_to.window(handle)
+                driver.close()
+            except Exception as e:
+                logger.warning(f"Could not close scraper tab: {str(e)}")
+        driver.switch_to.window(handles[0])
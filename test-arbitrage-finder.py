@@ -0,0 +1,18 @@
+from arbitrage_finder import check_n_way_arbitrage
+
+def n_way_market(bookmaker, market, *prices):
+    return {"bookmaker": bookmaker, "market": market, "odds": [
+        {"selection": selection, "odds": odds} for selection, odds in prices
+    ]}
+
+def test_incomplete_outright_lists_are_skipped():
+    # Only the favourites of a full field, each list implies well under 100%
+    first = n_way_market("Bet365", "Tournament Winner", ("Scheffler", 5.0), ("McIlroy", 9.0), ("Rahm", 12.0))
+    second = n_way_market("BetMGM", "Tournament Winner", ("Scheffler", 5.5), ("McIlroy", 8.0), ("Rahm", 13.0))
+    assert check_n_way_arbitrage("Golf", "The Masters", "Tournament Winner", [first, second]) is None
+
+def test_complete_lists_are_checked():
+    first = n_way_market("Bet365", "Set Betting", ("2-0", 2.6), ("2-1", 4.2), ("1-2", 5.5), ("0-2", 4.8))
+    second = n_way_market("BetMGM", "Set Betting", ("2-0", 2.3), ("2-1", 4.6), ("1-2", 5.9), ("0-2", 5.4))
+    opportunity = check_n_way_arbitrage("Tennis", "Sinner vs Alcaraz", "Set Betting", [first, second])
+    assert round(opportunity["profit_percentage"], 2) == 4.53
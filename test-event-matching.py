@@ -0,0 +1,85 @@
+from event_matching import EventMatcher, event_similarity, split_sides, MATCH_THRESHOLD
+from arbitrage_finder import find_arbitrage_opportunities
+from arbitrage_engine import IncrementalArbitrageEngine
+
+def same_event(a, b):
+    return event_similarity(split_sides(a), split_sides(b)) >= MATCH_THRESHOLD
+
+def test_abbreviated_names_match():
+    assert same_event("Montreal Canadiens vs Toronto Maple Leafs", "MTL Canadiens vs TOR Maple Leafs")
+    assert same_event("Manchester United vs Liverpool", "Man Utd vs Liverpool")
+    assert same_event("Los Angeles Lakers @ Boston Celtics", "LA Lakers vs Boston Celtics")
+
+def test_city_alone_matches_city_and_nickname():
+    assert same_event("Toronto Maple Leafs vs Montreal", "TOR Maple Leafs @ MTL Canadiens")
+    assert same_event("Toronto vs Montreal Canadiens", "Toronto Maple Leafs vs Montreal Canadiens")
+    assert not same_event("Toronto vs Montreal", "Toronto Raptors vs Boston Celtics")
+
+def test_squad_qualifiers_must_match():
+    assert not same_event("Arsenal W vs Chelsea W", "Arsenal vs Chelsea")
+    assert not same_event("Arsenal U21 vs Chelsea U21", "Arsenal vs Chelsea")
+    assert not same_event("Arsenal U21 vs Chelsea U21", "Arsenal U23 vs Chelsea U23")
+    assert same_event("Arsenal Women vs Chelsea Women", "Arsenal W vs Chelsea W")
+
+def test_different_clubs_of_one_city_dont_match():
+    assert not same_event("Sheffield Wednesday vs Leeds", "Sheffield United vs Leeds")
+    assert not same_event("Manchester United vs Liverpool", "Manchester City vs Liverpool")
+
+def test_matcher_keeps_different_fixtures_apart():
+    matcher = EventMatcher()
+    names = [
+        ("Bet365", "Arsenal vs Chelsea"),
+        ("BetMGM", "Arsenal W vs Chelsea W"),
+        ("Stake", "Arsenal U21 vs Chelsea U21"),
+        ("Bet365", "Sheffield United vs Leeds"),
+        ("BetMGM", "Sheffield Wednesday vs Leeds"),
+        ("Bet365", "Manchester City vs Liverpool"),
+        ("BetMGM", "Manchester United vs Liverpool")
+    ]
+    canonical = [matcher.canonical_name("Soccer", name, bookmaker, now=0) for bookmaker, name in names]
+    assert canonical == [name for _, name in names]
+
+def test_matcher_merges_the_same_fixture():
+    matcher = EventMatcher()
+    first = matcher.canonical_name("NHL", "Montreal Canadiens vs Toronto Maple Leafs", "Bet365", now=0)
+    second = matcher.canonical_name("NHL", "MTL Canadiens vs TOR Maple Leafs", "BetMGM", now=0)
+    assert first == second
+
+def test_matcher_merges_a_city_only_name():
+    matcher = EventMatcher()
+    first = matcher.canonical_name("NHL", "Toronto Maple Leafs vs Montreal", "Stake", now=0)
+    assert matcher.resolve("NHL", "TOR Maple Leafs @ MTL Canadiens", "BetMGM", now=0) == (first, False)
+
+def test_matcher_forgets_evicted_events():
+    matcher = EventMatcher(ttl=10)
+    matcher.canonical_name("NHL", "Toronto Maple Leafs vs Montreal Canadiens", "Bet365", now=0)
+    matcher.evict(now=100)
+    assert not matcher.events and not matcher.exact and not any(matcher.listed.values())
+    assert matcher.canonical_name("NHL", "Montreal Canadiens @ Toronto Maple Leafs", "BetMGM", now=100) == "Montreal Canadiens @ Toronto Maple Leafs"
+
+def money_line(bookmaker, event, *prices):
+    return {"NHL": [{"event": event, "market": "Money Line", "bookmaker": bookmaker, "odds": [
+        {"selection": selection, "odds": odds} for selection, odds in prices
+    ]}]}
+
+def test_swapped_sides_are_reordered():
+    matcher = EventMatcher()
+    assert matcher.resolve("NHL", "Toronto Maple Leafs vs Montreal Canadiens", "Bet365", now=0)[1] is False
+    assert matcher.resolve("NHL", "Montreal Canadiens @ Toronto Maple Leafs", "BetMGM", now=0) == (
+        "Toronto Maple Leafs vs Montreal Canadiens", True
+    )
+
+def test_swapped_sides_dont_make_a_false_arbitrage():
+    bet365 = money_line("Bet365", "Toronto Maple Leafs vs Montreal Canadiens", ("Toronto Maple Leafs", 1.5), ("Montreal Canadiens", 2.6))
+    betmgm = money_line("BetMGM", "Montreal Canadiens @ Toronto Maple Leafs", ("Montreal Canadiens", 2.5), ("Toronto Maple Leafs", 1.55))
+
+    assert find_arbitrage_opportunities(bet365, betmgm, matcher=EventMatcher()) == []
+    engine = IncrementalArbitrageEngine(matcher=EventMatcher())
+    assert engine.update({"Bet365": bet365, "BetMGM": betmgm}, now=0) == []
+
+def test_swapped_sides_keep_a_real_arbitrage():
+    bet365 = money_line("Bet365", "Toronto Maple Leafs vs Montreal Canadiens", ("Toronto Maple Leafs", 2.1), ("Montreal Canadiens", 1.7))
+    betmgm = money_line("BetMGM", "Montreal Canadiens @ Toronto Maple Leafs", ("Montreal Canadiens", 2.1), ("Toronto Maple Leafs", 1.7))
+
+    [opportunity] = find_arbitrage_opportunities(bet365, betmgm, matcher=EventMatcher())
+    assert {opportunity["bet1"]["selection"], opportunity["bet2"]["selection"]} == {"Toronto Maple Leafs", "Montreal Canadiens"}
@@ -0,0 +1,37 @@
+from line_markets import line_quotes, best_line_pair
+from alert_format import format_opportunity_subject
+
+def two_way_market(bookmaker, market, first, second):
+    return {"bookmaker": bookmaker, "market": market, "odds": [
+        {"selection": first[0], "odds": first[1]}, {"selection": second[0], "odds": second[1]}
+    ]}
+
+def test_line_in_market_name_is_the_first_sides():
+    named = two_way_market("Bet365", "Handicap -1.5", ("Arsenal", 2.1), ("Chelsea", 1.8))
+    labelled = two_way_market("BetMGM", "Handicap", ("Arsenal -1.5", 2.0), ("Chelsea +1.5", 1.9))
+
+    overs, unders = line_quotes("spread", "Arsenal vs Chelsea", [named, labelled])
+    assert [quote[0] for quote in overs] == [1.5, 1.5]
+    assert [quote[0] for quote in unders] == [1.5, 1.5]
+
+def test_total_line_in_market_name_is_shared():
+    market = two_way_market("Bet365", "Total Goals 2.5", ("Over", 1.9), ("Under", 1.9))
+    overs, unders = line_quotes("total", "Arsenal vs Chelsea", [market])
+    assert overs[0][0] == unders[0][0] == 2.5
+
+def test_same_line_pair_doesnt_hide_a_middle():
+    overs = [(2.5, 1.98, "Bet365", "Over 2.5")]
+    unders = [(2.5, 1.99, "BetMGM", "Under 2.5"), (3.5, 1.96, "Stake", "Under 3.5")]
+    over, under, margin = best_line_pair(overs, unders)
+    assert (over[0], under[0]) == (2.5, 3.5)
+    assert round((1 / margin - 1) * 100, 2) == -1.5
+
+def test_arbitrage_beats_a_middle():
+    overs = [(2.5, 1.98, "Bet365", "Over 2.5")]
+    unders = [(2.5, 2.05, "BetMGM", "Under 2.5"), (3.5, 1.96, "Stake", "Under 3.5")]
+    assert best_line_pair(overs, unders)[1][0] == 2.5
+
+def test_middles_get_their_own_subject():
+    middle = {"profit_percentage": -1.52, "middle": [2.5, 3.5]}
+    assert format_opportunity_subject(middle) == "Middle Opportunity: 1.52% worst-case loss"
+    assert format_opportunity_subject({"profit_percentage": 1.2, "middle": None}) == "Arbitrage Opportunity: 1.20% profit"
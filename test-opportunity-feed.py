@@ -0,0 +1,88 @@
+import os
+import tempfile
+import threading
+
+# main records odds and writes a log file when imported, keep both out of the way
+os.environ.setdefault("ODDS_HISTORY", "0")
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "arbitrage_bot_test.log"))
+
+import main
+from opportunity_feed import OpportunityFeed
+
+def opportunity(event, profit=2.0):
+    return {"sport": "NBA", "event": event, "market": "Money Line", "profit_percentage": profit}
+
+def read_events(response, count):
+    """The first `count` events of a server-sent event stream"""
+    events = []
+    for chunk in response.response:
+        text = chunk.decode() if isinstance(chunk, bytes) else chunk
+        if text.startswith("id: "):
+            events.append(int(text.split("\n")[0][4:]))
+            if len(events) == count:
+                break
+    response.close()
+    return events
+
+def test_stream_resumes_after_since():
+    main.opportunity_feed = OpportunityFeed()
+    for number in range(5):
+        main.opportunity_feed.publish("open", number, opportunity(f"Game {number}"))
+
+    response = main.app.test_client().get("/opportunities/stream?since=2", buffered=False)
+    assert read_events(response, 3) == [3, 4, 5]
+
+def test_stream_prefers_last_event_id():
+    main.opportunity_feed = OpportunityFeed()
+    for number in range(5):
+        main.opportunity_feed.publish("open", number, opportunity(f"Game {number}"))
+
+    response = main.app.test_client().get("/opportunities/stream?since=1", headers={"Last-Event-ID": "3"}, buffered=False)
+    assert read_events(response, 2) == [4, 5]
+
+def test_concurrent_publishers_get_unique_ids():
+    feed = OpportunityFeed(size=10000)
+
+    def publish(thread):
+        for number in range(500):
+            feed.publish("open", (thread, number), opportunity(f"Game {thread} {number}"))
+
+    threads = [threading.Thread(target=publish, args=(thread,)) for thread in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ids = [event["id"] for event in feed.since(0)]
+    assert sorted(ids) == list(range(1, 4001))
+    assert ids == sorted(ids)
+
+def test_stream_since_zero_replays_the_buffer():
+    main.opportunity_feed = OpportunityFeed()
+    for number in range(3):
+        main.opportunity_feed.publish("open", number, opportunity(f"Game {number}"))
+
+    response = main.app.test_client().get("/opportunities/stream?since=0", buffered=False)
+    assert read_events(response, 3) == [1, 2, 3]
+
+def test_new_stream_starts_from_now():
+    main.opportunity_feed = OpportunityFeed()
+    main.opportunity_feed.publish("open", 0, opportunity("Game 0"))
+
+    stream = main.opportunity_feed.stream(keepalive=0.01)
+    assert next(stream).startswith("retry:")
+    main.opportunity_feed.publish("open", 1, opportunity("Game 1"))
+    assert next(stream).startswith("id: 2\n")
+
+def test_query_limit_below_one_returns_nothing():
+    feed = OpportunityFeed()
+    feed.publish("open", 1, opportunity("Game 1"))
+    assert feed.query(limit=0) == []
+
+def test_endpoint_clamps_limit_to_one():
+    main.opportunity_feed = OpportunityFeed()
+    for number in range(3):
+        main.opportunity_feed.publish("open", number, opportunity(f"Game {number}"))
+
+    events = main.app.test_client().get("/opportunities?limit=0").get_json()["opportunities"]
+    assert [event["id"] for event in events] == [3]